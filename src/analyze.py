@@ -4,25 +4,24 @@
     All the data crunching is done in the ElasticSearch.
 """
 
-import os, sys, json, argparse, copy, urllib.parse, itertools
+import os, sys, json, argparse, copy, urllib.parse, itertools, collections, heapq, operator
+import concurrent.futures
 
-import dateutil.parser
-
-import matplotlib
-# We need to activate the backend. Make sure it's present on the system. (python3-tk system pkg etc.)
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as pyplot
-import matplotlib.dates
-
-import numpy.polynomial.polynomial as poly
+import numpy
 
 from elasticsearch import Elasticsearch
+from elasticsearch import helpers as es_helpers
 from elasticsearch.exceptions import NotFoundError as EsNotFoundError
 from elasticsearch_dsl import Search, A, F
 
 
 DEBUG = False
 
+# Plotting modules, imported lazily via GetPyplot() so that non-plot commands
+# (e.g. --only-stats or -l) don't pay the matplotlib startup cost
+matplotlib = None
+pyplot = None
+
 ### Global variables for appropriate command line options
 
 # List of users you want analyze
@@ -46,9 +45,26 @@ MIN_INTERACTIONS = 0.05
 # Number of posts to analyze
 POST_COUNT = 1000
 
-# Global pyplot settings
-pyplot.rcParams['xtick.minor.visible'] = True
-pyplot.rcParams['ytick.minor.visible'] = True
+
+def GetPyplot():
+    """ Import matplotlib on first use and return the pyplot module """
+
+    global matplotlib, pyplot
+    if pyplot is None:
+        import matplotlib
+        # We only ever render to files, so use the non-interactive Agg backend:
+        # no GUI toolkit import/init cost and it works on headless servers
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as pyplot
+        import matplotlib.dates
+
+        # Global pyplot settings
+        pyplot.rcParams['xtick.minor.visible'] = True
+        pyplot.rcParams['ytick.minor.visible'] = True
+        # Keep text as text in SVG output instead of converting every glyph to paths
+        pyplot.rcParams['svg.fonttype'] = 'none'
+
+    return pyplot
 
 
 # Future possible queries
@@ -113,18 +129,46 @@ def ParseArguments():
 class Analyzer:
     """ Perform various analyses on data stored in Elasticsearch """
 
+    # Keep a bigger urllib3 connection pool so batched/parallel requests don't block
+    # waiting for a free (keep-alive) connection
+    ES_POOL_MAXSIZE = 32
+    # How many seconds to wait for Elasticsearch to respond
+    ES_TIMEOUT = 30
+
     def __init__(self, index, data_source, es_address=None):
+        esOptions = {
+            'maxsize': self.ES_POOL_MAXSIZE,
+            'timeout': self.ES_TIMEOUT,
+            'retry_on_timeout': True,
+        }
         if es_address:
-            self.es = Elasticsearch(es_address)
+            self.es = Elasticsearch(es_address, **esOptions)
         else:
-            self.es = Elasticsearch()
+            self.es = Elasticsearch(**esOptions)
         self.index = index
+        # Remembered so worker processes can construct their own equivalent Analyzer
+        self.es_address = es_address
         # Do not access directly, only via the getter (otherwise you might break your request pipeline)
         self._es_search =  Search().using(self.es).index(index)
-
-        # Line style counters
-        self._lineTypeCounter = 0
-        self._lineColourCounter = 0
+        # Prebuilt per-doc_type search templates, filled in after the doc types are known (see below)
+        self._es_search_templates = {}
+
+        # Shared thread pool for issuing independent ES requests concurrently
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+        # Per-run caches: the underlying data doesn't change during one analysis run,
+        # so repeated lookups don't have to hit Elasticsearch again
+        self._post_count_cache = {}
+        self._authors_cache = None
+        self._name_to_id = None
+        self._author_doc_cache = {}
+        self._interaction_counts_cache = {}
+        self._share_count_cache = {}
+        self._posts_cache = {}
+        self._followers_by_type_cache = {}
+
+        # Index of the next unused line style
+        self._lineStyleIdx = 0
 
         # Save shortened source string (e.g. 'fb')
         if data_source.lower() not in ('fb', 'facebook', 'tw', 'twitter'):
@@ -141,9 +185,20 @@ class Analyzer:
         self.doc_type_interaction = '{0}_interaction'.format(self.data_source)
         self.doc_type_user = '{0}_user'.format(self.data_source)
 
+        # Build the search template for each doc type once, so the helpers don't
+        # have to re-apply the doc type (an extra Search clone) on every request
+        for docType in (self.doc_type_post, self.doc_type_interaction, self.doc_type_user):
+            self._es_search_templates[docType] = self._es_search.doc_type(docType)
+
 
-    def get_es_search(self):
-        """ Return a copy of internal elasticsearch_dsl.Search instance """
+    def get_es_search(self, doc_type=None):
+        """ Return a copy of internal elasticsearch_dsl.Search instance
+
+        :param doc_type: return a template limited to the given document type (optional)
+        """
+
+        if doc_type:
+            return copy.copy(self._es_search_templates[doc_type])
 
         return copy.copy(self._es_search)
 
@@ -176,6 +231,51 @@ class Analyzer:
         return es_search_instance.execute()
 
 
+    def execute_es_count(self, doc_type, es_filter):
+        """Execute a count request for the given filter
+
+        Uses the _count endpoint, which is cheaper than a size=0 search: Elasticsearch skips
+        the hit collection bookkeeping and returns just the count.
+
+        :param doc_type: document type for the request
+        :param es_filter: filter to apply
+        :return matching document count (int)
+        """
+
+        ess = self.get_es_search().filter(es_filter)
+        body = {'query': ess.to_dict()['query']}
+
+        if DEBUG:
+            print("Raw count query:")
+            print(json.dumps(body, indent=2))
+
+        response = self.es.count(index=self.index, doc_type=doc_type, body=body)
+        return response['count']
+
+
+    def execute_es_aggregation(self, doc_type, es_filter, aggs):
+        """Execute an aggregation-only search via the low-level client
+
+        Returns the raw aggregations dict directly, skipping the elasticsearch_dsl
+        Response/AttrDict wrapping of the (hit-less) response.
+
+        :param doc_type: document type for the request
+        :param es_filter: filter to apply
+        :param aggs: aggregation definition (dict)
+        :return 'aggregations' part of the response (dict)
+        """
+
+        query = self.get_es_search().filter(es_filter).to_dict()['query']
+        body = {'query': query, 'size': 0, 'aggs': aggs}
+
+        if DEBUG:
+            print("Raw aggregation query:")
+            print(json.dumps(body, indent=2))
+
+        response = self.es.search(index=self.index, doc_type=doc_type, body=body)
+        return response['aggregations']
+
+
     @staticmethod
     def _get_author_id_list(author_ids):
         """ Given either string or a list, ensure a list is returned.
@@ -185,49 +285,77 @@ class Analyzer:
         """
 
         authorList = author_ids
-        if type(author_ids) is str:  # create a list so we can iterate over it
+        if isinstance(author_ids, str):  # create a list so we can iterate over it
             authorList = [author_ids]
-        elif not type(author_ids) is list and not type(author_ids) is tuple:
+        elif not isinstance(author_ids, (list, tuple)):
             raise ValueError("'author_ids' argument has to be either string, list or tuple")
 
         return authorList
 
 
+    # All unique line styles, precomputed once: colours (blue, green, red, black, magenta)
+    # cycled through line types (solid, dashed, dash-dotted, dotted)
+    LINE_STYLES = tuple( "{0}{1}".format(colour, lineType)
+                         for lineType in ('-', '--', '-.', ':')
+                         for colour in ('b', 'g', 'r', 'k', 'm') )
+
     def _get_line_style(self, marker_style='', reset=False):
         """ Return unique line style each time this function is called
 
         :param marker_style: marker you want to use (string)
-        :param reset: when True, set internal counters to zero
+        :param reset: when True, set internal counter to zero
         :return: string with line format
         """
 
-        # Line styles: solid, dashed, dash-dotted, dotted
-        lineTypes = ('-', '--', '-.', ':')
-        # Line colours: blue, green, red, black, magenta
-        lineColours = ('b', 'g', 'r', 'k', 'm')
+        if reset:  # return first style, do not increment
+            self._lineStyleIdx = 0
+            return self.LINE_STYLES[0] + marker_style
 
-        # Add local static variables
-        if reset:
-            self._lineTypeCounter = 0
-            self._lineColourCounter = 0
-
-        if reset:  # return first colour, do not increment
-            return "{0}{1}{2}".format(lineColours[0], lineTypes[0], marker_style)
-
-        # First increment only line colour, then line styles
-        if self._lineColourCounter > len(lineColours) - 1:
-            self._lineColourCounter = 0
-            if self._lineTypeCounter >= len(lineTypes) - 1:
-                raise RuntimeError("No more unique line styles")
-            self._lineTypeCounter += 1
+        if self._lineStyleIdx >= len(self.LINE_STYLES):
+            raise RuntimeError("No more unique line styles")
 
         # Line with data point marker (+)
-        style = "{0}{1}{2}".format(lineColours[self._lineColourCounter], lineTypes[self._lineTypeCounter], marker_style)
+        style = self.LINE_STYLES[self._lineStyleIdx] + marker_style
 
-        self._lineColourCounter += 1
+        self._lineStyleIdx += 1
         return style
 
 
+    def _get_author_doc(self, author_id):
+        """ Return the user document for the author, fetching and caching it when needed
+
+        :param author_id: ID of the user
+        :return: user document source (dict)
+        """
+
+        if author_id not in self._author_doc_cache:
+            userInfo = self.es.get(index=self.index, doc_type=self.doc_type_user, id=author_id)
+            self._author_doc_cache[author_id] = userInfo['_source']
+
+        return self._author_doc_cache[author_id]
+
+
+    def get_author_docs(self, author_ids):
+        """ Fetch user documents for the given authors in one mget request
+
+        Documents seen before are answered from the cache, the rest are fetched with a single
+        multi-get instead of one GET round-trip per author. Unknown IDs are left out.
+
+        :param author_ids: iterable of user IDs
+        :return: dict mapping author ID to the user document source
+        """
+
+        missingIds = [ authorId for authorId in author_ids if authorId not in self._author_doc_cache ]
+        if missingIds:
+            response = self.es.mget(index=self.index, doc_type=self.doc_type_user, body={'ids': missingIds})
+            for doc in response['docs']:
+                if doc.get('found'):
+                    self._author_doc_cache[doc['_id']] = doc['_source']
+
+        return { authorId: self._author_doc_cache[authorId] for authorId in author_ids
+                 if authorId in self._author_doc_cache }
+
+
     def get_author_name(self, author_id, ensure_ascii=True):
         """ Return author's name.
 
@@ -236,11 +364,11 @@ class Analyzer:
         :return: username (string)
         """
 
-        userInfo = self.es.get(index=self.index, doc_type=self.doc_type_user, id=author_id)
+        userInfo = self._get_author_doc(author_id)
         if ensure_ascii:
-            return userInfo['_source']['name_ascii']
+            return userInfo['name_ascii']
         else:
-            return userInfo['_source']['name']
+            return userInfo['name']
 
 
     def get_author_id(self, author_name):
@@ -250,13 +378,18 @@ class Analyzer:
         :return: user's ID (string
         """
 
-        authors = self.get_authors_all()
+        # Build the name --> ID index once, further lookups are just a dict access
+        if self._name_to_id is None:
+            self._name_to_id = {}
+            for author in self.get_authors_all():
+                self._name_to_id[author['name']] = author['id']
+                self._name_to_id[author['name_ascii']] = author['id']
 
-        for author in authors:
-            if author_name in (author['name'], author['name_ascii']):
-                return author['id']
+        authorId = self._name_to_id.get(author_name)
+        if authorId is None:
+            raise RuntimeError('User {0} not found in Elasticsearch'.format(author_name))
 
-        raise RuntimeError('User {0} not found in Elasticsearch'.format(author_name))
+        return authorId
 
 
     def get_author_id_from_string(self, author_string):
@@ -267,34 +400,40 @@ class Analyzer:
         """
 
         try:
-            # Check if we got author name
-            authorId = self.get_author_id(author_string)
-            return authorId  # we've got author's name in author_string
-        except RuntimeError:
-            # Check if we got author ID. If it throws, user doesn't exist
-            authorName = self.get_author_name(author_string)
-            return self.get_author_id(authorName)
+            # An ID lookup is a single cheap GET on the _id, try it first
+            return self._get_author_doc(author_string)['id']
+        except EsNotFoundError:
+            # Not an ID, resolve it as a name via the cached name --> ID index.
+            # If that throws as well, the user doesn't exist.
+            return self.get_author_id(author_string)
 
 
     def get_authors_all(self):
         """ Get all available authors
 
+        The result is cached, only the first call hits Elasticsearch.
+
         :return: list of author dicts
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=10000)  # return all authors
-        isAuthorFilter = F('term', is_author=True)
+        if self._authors_cache is not None:
+            return self._authors_cache
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_user, es_filter=isAuthorFilter)
+        isAuthorFilter = F('term', is_author=True)
+        query = self.get_es_search(self.doc_type_user).filter(isAuthorFilter).to_dict()
 
-        if not response.success():
-            raise RuntimeError('Elasticsearch request failed')
+        if DEBUG:
+            print("Raw scan query:")
+            print(json.dumps(query, indent=2))
 
+        # Scroll through the results instead of one big request: no 10k-hit response
+        # buffered at once and no silent truncation above 10k authors
         authors = []
-        for hit in response.hits:
-            authors.append(hit.to_dict())
+        for hit in es_helpers.scan(self.es, index=self.index, doc_type=self.doc_type_user,
+                                   query=query, size=1000):
+            authors.append(hit['_source'])
 
+        self._authors_cache = authors
         return authors
 
 
@@ -305,8 +444,8 @@ class Analyzer:
         :return fan count (int)
         """
 
-        userData = self.es.get(index=self.index, doc_type=self.doc_type_user, id=author_id)
-        return userData['_source']['fan_count']
+        userData = self._get_author_doc(author_id)
+        return userData['fan_count']
 
 
     def get_post(self, post_id):
@@ -326,12 +465,12 @@ class Analyzer:
         :return post as a Python dict
         """
 
-        ess = self.get_es_search()
+        ess = self.get_es_search(self.doc_type_post)
         ess = ess.params(size=1)  # only one post
         ess = ess.sort('-created_time')  # sort from newest to oldest
 
         authorFilter = F('term', author=author_id)
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=authorFilter)
+        response = self.execute_es_request(ess, es_filter=authorFilter)
         if not response.success():
             raise RuntimeError('Request failed')
 
@@ -344,17 +483,24 @@ class Analyzer:
     def get_posts(self, author_id, status_count=100):
         """ Return given number of latest posts for the given author.
 
+        The result is cached per (author, count), so the plot methods which all
+        walk the same posts fetch them from Elasticsearch only once.
+
         :param author_id: user ID
         :param status_count: number of post you want to return (default: 100)
         :return: list of post dictionaries
         """
 
-        ess = self.get_es_search()
+        cacheKey = (author_id, status_count)
+        if cacheKey in self._posts_cache:
+            return self._posts_cache[cacheKey]
+
+        ess = self.get_es_search(self.doc_type_post)
         ess = ess.params(size=status_count)
         ess = ess.sort('-created_time')  # sort from newest to oldest
 
         authorFilter = F('term', author=author_id)
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=authorFilter)
+        response = self.execute_es_request(ess, es_filter=authorFilter)
         if not response.success():
             raise RuntimeError('Request failed')
 
@@ -362,9 +508,83 @@ class Analyzer:
         for post in response.hits:
             posts.append(post.to_dict())
 
+        self._posts_cache[cacheKey] = posts
         return posts
 
 
+    # How many posts go into one msearch request; bigger lists are split into chunks
+    # of this size and the chunks are dispatched in parallel
+    MSEARCH_CHUNK_SIZE = 50
+
+    def batch_interactions_for_posts(self, post_ids, interaction_type=None, aggs=None, size=10000, fields=None,
+                                     add_filter=None):
+        """ Fetch interactions for many posts in batched msearch requests
+
+        Instead of one search request per post (and thus one HTTP round-trip each), the posts
+        are grouped into multi-search calls of MSEARCH_CHUNK_SIZE sub-requests each, and the
+        chunks are submitted concurrently through the shared thread pool.
+
+        :param post_ids: list of post IDs
+        :param interaction_type: limit to one interaction type, e.g. 'comment' (optional)
+        :param aggs: aggregation definition (dict) to attach to every sub-request (optional)
+        :param size: how many hits to return per post (default: 10000)
+        :param fields: fetch only the given fields instead of full documents (list, optional)
+        :param add_filter: additional filter you want to use (optional)
+        :return: list of raw response dicts, one per post (same order as post_ids)
+        """
+
+        chunks = [ post_ids[i:i + self.MSEARCH_CHUNK_SIZE]
+                   for i in range(0, len(post_ids), self.MSEARCH_CHUNK_SIZE) ]
+
+        if len(chunks) <= 1:  # single request, no need for the thread pool
+            return self._msearch_interactions(post_ids, interaction_type, aggs, size, fields, add_filter)
+
+        futures = [ self._executor.submit(self._msearch_interactions, chunk, interaction_type,
+                                          aggs, size, fields, add_filter)
+                    for chunk in chunks ]
+
+        responses = []
+        for future in futures:  # futures are in chunk order, so responses keep the post order
+            responses.extend(future.result())
+
+        return responses
+
+
+    def _msearch_interactions(self, post_ids, interaction_type=None, aggs=None, size=10000, fields=None,
+                              add_filter=None):
+        """ Issue one msearch request for the given posts, see batch_interactions_for_posts """
+
+        requestBody = []
+        for postId in post_ids:
+            statusIdFilter = F('term', status_id=postId)
+            if interaction_type:
+                statusIdFilter &= F('term', type=interaction_type)
+            if add_filter:
+                statusIdFilter &= add_filter
+
+            ess = self.get_es_search().filter(statusIdFilter)
+            body = ess.to_dict()
+            body['size'] = size
+            if fields:
+                body['fields'] = fields
+            if aggs:
+                body['aggs'] = aggs
+
+            # Header and body pair for each sub-request
+            header = {'index': self.index, 'type': self.doc_type_interaction}
+            if size == 0:  # count-only sub-request, spare ES the hit collection
+                header['search_type'] = 'count'
+            requestBody.append(header)
+            requestBody.append(body)
+
+        if DEBUG:
+            print("Raw msearch body:")
+            print(json.dumps(requestBody, indent=2))
+
+        response = self.es.msearch(body=requestBody)
+        return response['responses']
+
+
     def get_interactions_for_post(self, post_id):
         """ Get all interactions for the given post
 
@@ -373,44 +593,50 @@ class Analyzer:
         """
 
         statusIdFilter = F('term', status_id=post_id)
-        return self.execute_es_request(self.get_es_search(), doc_type=self.doc_type_interaction,
-                                       es_filter=statusIdFilter)
+        return self.execute_es_request(self.get_es_search(self.doc_type_interaction), es_filter=statusIdFilter)
 
 
     def get_likes_for_post(self, post_id):
-        """ Get all likes for the given post
+        """ Get all likes for the given post(s)
 
-        :param post_id: ID of a post
-        :return elasticsearch_dsl.Response instance
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return elasticsearch_dsl.Response instance, or a list of raw response dicts for a list
         """
 
+        if isinstance(post_id, (list, tuple)):
+            return self.batch_interactions_for_posts(post_id, interaction_type='like')
+
         statusIdFilter = F('term', status_id=post_id) & F('term', type='like')
-        return self.execute_es_request(self.get_es_search(), doc_type=self.doc_type_interaction,
-                                       es_filter=statusIdFilter)
+        return self.execute_es_request(self.get_es_search(self.doc_type_interaction), es_filter=statusIdFilter)
 
 
     def get_shares_for_post(self, post_id):
-        """ Get all shares for the given post
+        """ Get all shares for the given post(s)
 
-        :param post_id: ID of a post
-        :return elasticsearch_dsl.Response instance
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return elasticsearch_dsl.Response instance, or a list of raw response dicts for a list
         """
 
+        if isinstance(post_id, (list, tuple)):
+            return self.batch_interactions_for_posts(post_id, interaction_type='share')
+
         statusIdFilter = F('term', status_id=post_id) & F('term', type='share')
-        return self.execute_es_request(self.get_es_search(), doc_type=self.doc_type_interaction,
-                                       es_filter=statusIdFilter)
+        return self.execute_es_request(self.get_es_search(self.doc_type_interaction), es_filter=statusIdFilter)
 
 
     def get_comments_for_post(self, post_id):
-        """ Get all comments for the given post
+        """ Get all comments for the given post(s)
 
-        :param post_id: ID of a post
-        :return List of comment objects
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return List of comment objects, or a list of such lists (one per post) for a list
         """
 
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='comment')
+            return [ [ hit['_source'] for hit in resp['hits']['hits'] ] for resp in responses ]
+
         statusIdFilter = F('term', status_id=post_id) & F('term', type='comment')
-        response = self.execute_es_request(self.get_es_search(), doc_type=self.doc_type_interaction,
-                                       es_filter=statusIdFilter)
+        response = self.execute_es_request(self.get_es_search(self.doc_type_interaction), es_filter=statusIdFilter)
         if not response.success():
             raise RuntimeError('Request failed')
 
@@ -421,174 +647,164 @@ class Analyzer:
         return comments
 
 
-    def get_sentiment_for_post(self, post_id):
-        """ Get total sentiment of comments for the given post
+    # Terms aggregation tallying comment sentiment labels on the ES side
+    SENTIMENT_AGG = {'sentiment': {'terms': {'field': 'message_sentiment'}}}
 
-        :param post_id: ID of a post
+    @staticmethod
+    def _sentiment_from_buckets(buckets):
+        """ Compute total sentiment from a terms aggregation over message_sentiment
+
+        Positive comments count +1, negative ones -1; neutral and bipolar labels are ignored.
+
+        :param buckets: bucket list of the terms aggregation
         :return total sentiment (int)
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(fields=['message_sentiment'], size=10000)
-        commentFilter =  F('term', status_id=post_id) & F('term', type='comment')\
-                         & F('exists', field='message_sentiment')
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=commentFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        counts = { bucket['key']: bucket['doc_count'] for bucket in buckets }
+        return counts.get('p', 0) - counts.get('n', 0)
 
-        totalSentiment = 0
-        for comment in response.hits:
-            sent = comment['message_sentiment'][0]
-            if sent == 'p':  # positive
-                totalSentiment += 1
-            elif sent == 'n':  # negative
-                totalSentiment += 1
 
-        return totalSentiment
+    def get_sentiment_for_post(self, post_id):
+        """ Get total sentiment of comments for the given post(s)
+
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return total sentiment (int), or a list of totals (one per post) for a list
+        """
+
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='comment',
+                                                          size=0, aggs=self.SENTIMENT_AGG)
+            return [ self._sentiment_from_buckets(resp['aggregations']['sentiment']['buckets'])
+                     for resp in responses ]
+
+        commentFilter = F('term', status_id=post_id) & F('term', type='comment')
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, commentFilter, self.SENTIMENT_AGG)
+        return self._sentiment_from_buckets(aggregations['sentiment']['buckets'])
 
 
     def get_count_likes_for_post(self, post_id):
-        """ Get count of all likes for the given post
+        """ Get count of all likes for the given post(s)
 
-        :param post_id: ID of a post
-        :return number of likes (int)
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return number of likes (int), or a list of counts (one per post) for a list
         """
 
-        response = self.get_likes_for_post(post_id)
-        if not response.success():
-            raise RuntimeError('Request failed')
-        return response.hits.total
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='like', size=0)
+            return [ resp['hits']['total'] for resp in responses ]
+
+        likeFilter = F('term', status_id=post_id) & F('term', type='like')
+        return self.execute_es_count(self.doc_type_interaction, likeFilter)
 
 
     def get_count_shares_for_post(self, post_id):
-        """ Get count of all shares for the given post
+        """ Get count of all shares for the given post(s)
 
-        :param post_id: ID of a post
-        :return number of shares (int)
+        :param post_id: ID of a post, or a list of post IDs (batched into one msearch request)
+        :return number of shares (int), or a list of counts (one per post) for a list
         """
 
-        response = self.get_shares_for_post(post_id)
-        if not response.success():
-            raise RuntimeError('Request failed')
-        return response.hits.total
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='share', size=0)
+            return [ resp['hits']['total'] for resp in responses ]
+
+        shareFilter = F('term', status_id=post_id) & F('term', type='share')
+        return self.execute_es_count(self.doc_type_interaction, shareFilter)
 
 
     def get_count_comments_for_post(self, post_id):
-        """ Get number of comments for the given post
+        """ Get number of comments for the given post(s)
 
-        :param post_id: post you want to analyze
-        :return: number of comments
+        :param post_id: post you want to analyze, or a list of post IDs (batched into one msearch request)
+        :return: number of comments, or a list of counts (one per post) for a list
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=0)  # do not return hits, just the count
-        commentFilter =  F('term', status_id=post_id) & F('term', type='comment')
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=commentFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='comment', size=0)
+            return [ resp['hits']['total'] for resp in responses ]
 
-        return response.hits.total
+        commentFilter = F('term', status_id=post_id) & F('term', type='comment')
+        return self.execute_es_count(self.doc_type_interaction, commentFilter)
 
 
     def get_average_comment_len_for_post(self, post_id):
-        """ Get average length of a comment for a post
+        """ Get average length of a comment for a post (or posts)
 
-        :param post_id: post you want to analyze
-        :return: average length of a comment for post
+        :param post_id: post you want to analyze, or a list of post IDs (batched into one msearch request)
+        :return: average length of a comment for post, or a list of averages (one per post) for a list
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(fields=['message_len'], size=10000)  # limit the number of analyzed comments
-        commentFilter = F('term', status_id=post_id) & F('term', type='comment') \
-                        & F('exists', field='message_len')
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=commentFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        # Averaging is done by ES, a missing value means the post has no comments
+        avgLenAgg = {'avg_len': {'avg': {'field': 'message_len'}}}
 
-        commentCount = response.hits.total or 1
-        totalLength = 0
-        for comment in response.hits:
-            length = comment.to_dict().get('message_len')[0]  # Returns the first element from a list
-            totalLength += length
+        if isinstance(post_id, (list, tuple)):
+            responses = self.batch_interactions_for_posts(post_id, interaction_type='comment',
+                                                          size=0, aggs=avgLenAgg)
+            return [ resp['aggregations']['avg_len']['value'] or 0 for resp in responses ]
 
-        return totalLength / commentCount
+        commentFilter = F('term', status_id=post_id) & F('term', type='comment')
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, commentFilter, avgLenAgg)
+        return aggregations['avg_len']['value'] or 0
 
 
     def get_count_all_posts(self, author_id):
         """ Get number of all posts the author has published
 
+        The count is cached, repeated calls for the same author don't hit Elasticsearch.
+
         :param author_id: author's ID
         :return: total post count
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=0)  # do not return hits, just the count
-        authorFilter = F('term', author=author_id)
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=authorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        if author_id not in self._post_count_cache:
+            authorFilter = F('term', author=author_id)
+            self._post_count_cache[author_id] = self.execute_es_count(self.doc_type_post, authorFilter)
 
-        return response.hits.total
+        return self._post_count_cache[author_id]
 
 
     def get_count_all_likes(self, author_id):
         """ Get count of all likes the author has received
 
+        Served from the cached per-author interaction counts, so repeated calls
+        (stats report plus the averages) don't hit Elasticsearch again.
+
         :param author_id: author's ID
         :return: total like count
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=0)  # do not return hits, just the count
-        statusAuthorLikeFilter = F('term', status_author=author_id) & F('term', type='like')
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorLikeFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
-
-        return response.hits.total
+        return self.get_interaction_counts(author_id)['likes']
 
 
     def get_count_all_comments(self, author_id):
         """ Get count of all comments the author has received
 
+        Served from the cached per-author interaction counts, see get_count_all_likes.
+
         :param author_id: author's ID
         :return: total like count
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=0)  # do not return hits, just the count
-        statusAuthorLikeFilter = F('term', status_author=author_id) & F('term', type='comment')
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorLikeFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
-
-        return response.hits.total
+        return self.get_interaction_counts(author_id)['comments']
 
 
     def get_count_all_shares(self, author_id):
         """ Get count of all shares the author has received
 
+        The count is cached, repeated calls for the same author don't hit Elasticsearch.
+
         :param author_id: author's ID
         :return: total share count (int)
         """
 
-        ess = self.get_es_search()
-        ess = ess.params(size=0)  # do not return hits, just the count
-        statusAuthorFilter = F('term', author=author_id)
+        if author_id not in self._share_count_cache:
+            statusAuthorFilter = F('term', author=author_id)
+            sumShareAgg = {'sum_shares': {'sum': {'field': 'share_count'}}}
 
-        aggregationName = 'sum_shares'
-        sumShareAgg = A('sum', field='share_count')
-        ess.aggs.bucket(aggregationName, sumShareAgg)
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=statusAuthorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+            aggregations = self.execute_es_aggregation(self.doc_type_post, statusAuthorFilter, sumShareAgg)
+            self._share_count_cache[author_id] = int(aggregations['sum_shares']['value'])
 
-        response = response.to_dict()
-        return int(response['aggregations'][aggregationName]['value'])
+        return self._share_count_cache[author_id]
 
 
     def get_average_likes(self, author_id):
@@ -598,10 +814,11 @@ class Analyzer:
         :return: average like count per status (float)
         """
 
-        totalLikes = self.get_count_all_likes(author_id)
-        statusCount = self.get_count_all_posts(author_id)
+        # Both counts are independent requests, overlap them
+        totalLikes = self._executor.submit(self.get_count_all_likes, author_id)
+        statusCount = self._executor.submit(self.get_count_all_posts, author_id)
 
-        return totalLikes / statusCount
+        return totalLikes.result() / statusCount.result()
 
 
     def get_average_shares(self, author_id):
@@ -611,10 +828,11 @@ class Analyzer:
         :return: average share count per status (float)
         """
 
-        totalShares = self.get_count_all_shares(author_id)
-        statusCount = self.get_count_all_posts(author_id)
+        # Both counts are independent requests, overlap them
+        totalShares = self._executor.submit(self.get_count_all_shares, author_id)
+        statusCount = self._executor.submit(self.get_count_all_posts, author_id)
 
-        return totalShares / statusCount
+        return totalShares.result() / statusCount.result()
 
 
     def get_average_comments(self, author_id):
@@ -624,10 +842,11 @@ class Analyzer:
         :return: average comment count per status (float)
         """
 
-        totalComments = self.get_count_all_comments(author_id)
-        statusCount = self.get_count_all_posts(author_id)
+        # Both counts are independent requests, overlap them
+        totalComments = self._executor.submit(self.get_count_all_comments, author_id)
+        statusCount = self._executor.submit(self.get_count_all_posts, author_id)
 
-        return totalComments / statusCount
+        return totalComments.result() / statusCount.result()
 
 
     def get_followers_most_active(self, author_id, count=20):
@@ -640,22 +859,13 @@ class Analyzer:
 
         MIN_DOC_COUNT = 10  # return only results with more than 10 hits
 
-        ess = self.get_es_search()
-
-        aggregationName = 'terms_author'
-        termsAuthorAgg = A('terms', field='author', min_doc_count=MIN_DOC_COUNT, size=count)
-        ess.aggs.bucket(aggregationName, termsAuthorAgg)
-        ess = ess.params(size=0)  # do not return hits, just the aggregations
-
+        aggs = {'terms_author': {'terms': {'field': 'author', 'min_doc_count': MIN_DOC_COUNT, 'size': count}}}
         statusAuthorFilter = F('term', status_author=author_id)  # limit request to the given author
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusAuthorFilter, aggs)
 
-        responseDict = response.to_dict()
         users = {}
-        for bucket in responseDict['aggregations'][aggregationName]['buckets']:
+        for bucket in aggregations['terms_author']['buckets']:
             userId = bucket['key']
             users[userId] = bucket['doc_count']
 
@@ -671,33 +881,124 @@ class Analyzer:
         :return dictionary of user objects (at most 10k)
         """
 
-        ess = self.get_es_search()
         # Get all posts count and set a minimum interaction count
         postsCount = self.get_count_all_posts(author_id)
         minInteractions = int(min_interactions * postsCount)
 
-        aggregationName = 'terms_author'
-        termsAuthorAgg = A('terms', field='author', min_doc_count=minInteractions, size=10000)
-        ess.aggs.bucket(aggregationName, termsAuthorAgg)
-        ess = ess.params(size=0)  # do not return hits, just the aggregations
+        aggs = {'terms_author': {'terms': {'field': 'author', 'min_doc_count': minInteractions, 'size': 10000}}}
 
         statusAuthorFilter = F('term', status_author=author_id)  # limit request to the given author
         if add_filter:
             statusAuthorFilter &= add_filter
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusAuthorFilter, aggs)
 
-        responseDict = response.to_dict()
         users = {}
-        for bucket in responseDict['aggregations'][aggregationName]['buckets']:
+        for bucket in aggregations['terms_author']['buckets']:
             userId = bucket['key']
             users[userId] = bucket['doc_count']
 
         return users
 
 
+    def get_followers_active_bulk(self, author_ids, min_interactions=0.05, add_filter=None):
+        """ Get active followers for many authors in one msearch request
+
+        One terms aggregation per author is sent in a single multi-search call, so the fetch
+        phase costs one HTTP round-trip instead of one per author.
+
+        :param author_ids: list of user IDs you want to analyze
+        :param min_interactions: percentage of the minimum interactions over all posts (default: 0.05, i.e 5%)
+        :param add_filter: additional filter you want to use
+        :return: dict mapping author ID to a dictionary of user objects
+        """
+
+        requestBody = []
+        for authorId in author_ids:
+            # Get all posts count and set a minimum interaction count
+            postsCount = self.get_count_all_posts(authorId)
+            minInteractions = int(min_interactions * postsCount)
+
+            statusAuthorFilter = F('term', status_author=authorId)  # limit request to the given author
+            if add_filter:
+                statusAuthorFilter &= add_filter
+
+            query = self.get_es_search().filter(statusAuthorFilter).to_dict()['query']
+            aggs = {'terms_author': {'terms': {'field': 'author', 'min_doc_count': minInteractions,
+                                               'size': 10000}}}
+
+            requestBody.append({'index': self.index, 'type': self.doc_type_interaction,
+                                'search_type': 'count'})
+            requestBody.append({'query': query, 'size': 0, 'aggs': aggs})
+
+        if DEBUG:
+            print("Raw msearch body:")
+            print(json.dumps(requestBody, indent=2))
+
+        response = self.es.msearch(body=requestBody)
+
+        followersByAuthor = {}
+        for authorId, resp in zip(author_ids, response['responses']):
+            users = {}
+            for bucket in resp['aggregations']['terms_author']['buckets']:
+                userId = bucket['key']
+                users[userId] = bucket['doc_count']
+            followersByAuthor[authorId] = users
+
+        return followersByAuthor
+
+
+    def get_followers_active_by_type(self, author_id, min_interactions=0.05):
+        """ Get active followers for all interaction types in one request
+
+        Uses a filters bucket aggregation with like/share/comment buckets, so Elasticsearch
+        scans the interaction index once instead of three times.
+
+        :param author_id: user ID you want to analyze
+        :param min_interactions: percentage of the minimum interactions over all posts (default: 0.05, i.e 5%)
+        :return dict mapping interaction type ('like', 'share', 'comment') to a dict of user objects
+        """
+
+        cacheKey = (author_id, min_interactions)
+        if cacheKey in self._followers_by_type_cache:
+            return self._followers_by_type_cache[cacheKey]
+
+        # Get all posts count and set a minimum interaction count
+        postsCount = self.get_count_all_posts(author_id)
+        minInteractions = int(min_interactions * postsCount)
+
+        typeFilters = {
+            'like': F('term', type='like').to_dict(),
+            'share': F('term', type='share').to_dict(),
+            'comment': F('term', type='comment').to_dict(),
+        }
+        aggs = {
+            'by_type': {
+                'filters': {'filters': typeFilters},
+                'aggs': {
+                    'terms_author': {'terms': {'field': 'author', 'min_doc_count': minInteractions,
+                                               'size': 10000}}
+                }
+            }
+        }
+
+        statusAuthorFilter = F('term', status_author=author_id)  # limit request to the given author
+
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusAuthorFilter, aggs)
+        typeBuckets = aggregations['by_type']['buckets']
+
+        usersByType = {}
+        for interactionType in typeFilters:
+            users = {}
+            for bucket in typeBuckets[interactionType]['terms_author']['buckets']:
+                userId = bucket['key']
+                users[userId] = bucket['doc_count']
+            usersByType[interactionType] = users
+
+        self._followers_by_type_cache[cacheKey] = usersByType
+        return usersByType
+
+
     def get_followers_active_likes(self, author_id, min_interactions=0.05):
         """Get users who have liked on more than given percentage of posts made by the author
 
@@ -706,8 +1007,7 @@ class Analyzer:
         :return dictionary of user objects
         """
 
-        likeFilter = F('term', type='like')
-        return self.get_followers_active(author_id, min_interactions, likeFilter)
+        return self.get_followers_active_by_type(author_id, min_interactions)['like']
 
 
     def get_followers_active_shares(self, author_id, min_interactions=0.05):
@@ -718,8 +1018,7 @@ class Analyzer:
         :return dictionary of user objects
         """
 
-        shareFilter = F('term', type='share')
-        return self.get_followers_active(author_id, min_interactions, shareFilter)
+        return self.get_followers_active_by_type(author_id, min_interactions)['share']
 
 
     def get_followers_active_comments(self, author_id, min_interactions=0.05):
@@ -730,8 +1029,7 @@ class Analyzer:
         :return dictionary of user objects
         """
 
-        commentFilter = F('term', type='comment')
-        return self.get_followers_active(author_id, min_interactions, commentFilter)
+        return self.get_followers_active_by_type(author_id, min_interactions)['comment']
 
 
     def get_top_likers_commenters(self, author_id, min_interactions=0.05):
@@ -745,12 +1043,8 @@ class Analyzer:
         likers = self.get_followers_active_likes(author_id, min_interactions)
         commenters = self.get_followers_active_comments(author_id, min_interactions)
 
-        users = []
-        for liker in likers:
-            if liker in commenters:
-                users.append(liker)
-
-        return users
+        # dict.keys() views are set-like, intersect them directly
+        return list(likers.keys() & commenters.keys())
 
 
     def get_top_likers_sharers(self, author_id, min_interactions=0.05):
@@ -764,12 +1058,7 @@ class Analyzer:
         likers = self.get_followers_active_likes(author_id, min_interactions)
         sharers = self.get_followers_active_shares(author_id, min_interactions)
 
-        users = []
-        for liker in likers:
-            if liker in sharers:
-                users.append(liker)
-
-        return users
+        return list(likers.keys() & sharers.keys())
 
 
     def get_top_commenters_sharers(self, author_id, min_interactions=0.05):
@@ -783,12 +1072,7 @@ class Analyzer:
         commenters = self.get_followers_active_comments(author_id, min_interactions)
         sharers = self.get_followers_active_shares(author_id, min_interactions)
 
-        users = []
-        for commenter in commenters:
-            if commenter in sharers:
-                users.append(commenter)
-
-        return users
+        return list(commenters.keys() & sharers.keys())
 
 
     def get_top_likers_commenters_sharers(self, author_id, min_interactions=0.05):
@@ -799,17 +1083,16 @@ class Analyzer:
         :return list of user IDs
         """
 
-        likers = self.get_followers_active_likes(author_id, min_interactions)
-        commenters = self.get_followers_active_comments(author_id, min_interactions)
-        sharers = self.get_followers_active_shares(author_id, min_interactions)
+        # One filters aggregation answers all three interaction types at once
+        usersByType = self.get_followers_active_by_type(author_id, min_interactions)
 
-        users = []
-        for liker in likers:
-            if liker in sharers and liker in commenters:
-                users.append(liker)
+        return list(usersByType['like'].keys() & usersByType['comment'].keys() & usersByType['share'].keys())
 
-        return users
 
+    # Number of set bits for every possible byte value. Counting a packed bitset
+    # is then one table lookup per byte plus a sum, without unpacking the bitset
+    # into an eight times larger array first
+    POPCOUNT_TABLE = numpy.array([ bin(byte).count('1') for byte in range(256) ], dtype=numpy.uint8)
 
     def save_followers_cross_active(self, author_ids, min_interactions=0.05, add_filter=None, sub_dir=None,
                                     filename=None, headline=None):
@@ -836,28 +1119,62 @@ class Analyzer:
         if not headline:
             headline = "Active people"
 
-        # Save author names and their active users so we don't have to query it multiple times
+        # Save author names and their active users so we don't have to query it multiple times.
+        # Follower IDs are numeric, so keep them as sorted int64 arrays: intersecting two
+        # sorted arrays is one C-level merge instead of per-element hash probes
+        activeFollowers = self.get_followers_active_bulk(author_ids, min_interactions, add_filter)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
+
         authorNames = {}
         authorFollowers = {}
         for authorId in author_ids:
             authorNames[authorId] = self.get_author_name(authorId)
-            authorFollowers[authorId] = set(self.get_followers_active(authorId, min_interactions, add_filter))
-
-        # List of sets with possible combinations with 2 or more elements
-        combinations = []
-        for l in range(2, len(author_ids)+1):
-            for subset in itertools.combinations(author_ids, l):
-                combinations.append(subset)
+            followers = activeFollowers[authorId]
+            followerArray = numpy.fromiter(( int(userId) for userId in followers ),
+                                           dtype=numpy.int64, count=len(followers))
+            followerArray.sort()
+            authorFollowers[authorId] = followerArray
+
+        # The universe of candidate followers (union over the queried authors, at most 10k per
+        # author) is small, so encode each author's followers as a packed bitset over it.
+        # An intersection is then a word-parallel bitwise AND over the whole universe.
+        universe = numpy.unique(numpy.concatenate(list(authorFollowers.values())))
+        authorBitsets = {}
+        for authorId, followerArray in authorFollowers.items():
+            memberMask = numpy.zeros(universe.size, dtype=bool)
+            memberMask[numpy.searchsorted(universe, followerArray)] = True
+            authorBitsets[authorId] = numpy.packbits(memberMask)
 
         with open(filename, 'w') as fp:
-            for comb in combinations:
-                authorString = " ".join([ authorNames[authorId] for authorId in comb ])
-                fp.write("{0} on these authors: {1}\n".format(headline, authorString))
-                users = authorFollowers[comb[0]]  # first author
-                for i in range(1, len(comb)):
-                    newUsers = authorFollowers[comb[i]]
-                    users.intersection_update(newUsers)
-                fp.write("    Count: {0}\n".format(len(users)))
+            # Build intersections bottom-up over the subset lattice: every combination of l
+            # authors reuses an already computed (l-1)-author intersection instead of
+            # re-intersecting the full follower bitsets from scratch
+            intersections = {}
+            deadSubsets = set()  # empty intersections; every superset of these is empty too
+            for l in range(2, len(author_ids)+1):
+                for comb in itertools.combinations(author_ids, l):
+                    authorString = " ".join([ authorNames[authorId] for authorId in comb ])
+                    fp.write("{0} on these authors: {1}\n".format(headline, authorString))
+
+                    combSet = frozenset(comb)
+                    if any( dead <= combSet for dead in deadSubsets ):
+                        # Some sub-combination was already empty, no need to intersect at all
+                        fp.write("    Count: 0\n")
+                        continue
+
+                    if l == 2:
+                        mask = authorBitsets[comb[0]] & authorBitsets[comb[1]]
+                    else:
+                        # Extend the smallest cached sub-intersection with the remaining author
+                        subsets = [ (combSet - {authorId}, authorId) for authorId in comb ]
+                        subKey, extraId = min(subsets, key=lambda item: intersections[item[0]][1])
+                        mask = intersections[subKey][0] & authorBitsets[extraId]
+
+                    userCount = int(self.POPCOUNT_TABLE[mask].sum())
+                    if userCount == 0:
+                        deadSubsets.add(combSet)
+                    intersections[combSet] = (mask, userCount)
+                    fp.write("    Count: {0}\n".format(userCount))
 
 
     def save_followers_cross_likers(self, author_ids, min_interactions=0.05, sub_dir=None):
@@ -916,24 +1233,15 @@ class Analyzer:
         # Create a terms aggregation with buckets by status_id, i.e. aggregate all interactions that
         # have the same status_id in one bucket
 
-        ess = self.get_es_search()
-
-        aggregationName = 'terms_status_id'
-        termsStatusIdAgg = A('terms', field='status_id', size=count)
-        ess.aggs.bucket(aggregationName, termsStatusIdAgg)
-        ess = ess.params(size=0)  # we don't care about the hits
-
+        aggs = {'terms_status_id': {'terms': {'field': 'status_id', 'size': count}}}
         statusAuthorFilter = F('term', status_author=author_id)
 
         # Results are in the aggregations
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusAuthorFilter, aggs)
 
-        responseDict = response.to_dict()
         posts = {}
         # Iterate over fetched ids
-        for bucket in responseDict['aggregations'][aggregationName]['buckets']:
+        for bucket in aggregations['terms_status_id']['buckets']:
             postId = bucket['key']
             try:
                 posts[postId] = bucket['doc_count']
@@ -951,34 +1259,32 @@ class Analyzer:
         :return dict with links as keys and number of occurrences as values
         """
 
-        ess = self.get_es_search()
-        #Algorithm: fetch most popular posts, fetch one full post, check if it has a link field, append and continue
+        #Algorithm: fetch most popular posts, mget all of them at once, check for a link field
 
         # Be optimistic and expect at least one fifth of the author's posts are links
-        aggregationName = 'terms_status_id'
-        termsStatusIdAgg = A('terms', field='status_id', size=5*count)
-        ess.aggs.bucket(aggregationName, termsStatusIdAgg)
-        ess = ess.params(size=0)  # we don't care about the hits
-
+        aggs = {'terms_status_id': {'terms': {'field': 'status_id', 'size': 5*count}}}
         statusAuthorFilter = F('term', status_author=author_id)
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
-        if not response.success():
-            raise RuntimeError('Request failed')
-        responseDict = response.to_dict()
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusAuthorFilter, aggs)
+        buckets = aggregations['terms_status_id']['buckets']
         popularLinks = {}
 
-        # Iterate over fetched ids and download full posts
-        for bucket in responseDict['aggregations'][aggregationName]['buckets']:
-            postId = bucket['key']
-            try:
-                post = self.get_post(postId)
-                link = post['_source'].get('link', None)
-                if link:  # given post has a link, save it
-                    popularLinks[link] = bucket['doc_count']
-            except EsNotFoundError:  # maybe the post is not in the ES, ignore
+        if not buckets:
+            return popularLinks
+
+        # Fetch all candidate posts in one mget instead of a get request per bucket
+        response = self.es.mget(index=self.index, doc_type=self.doc_type_post,
+                                body={'ids': [ bucket['key'] for bucket in buckets ]},
+                                _source=['link'])
+
+        for bucket, doc in zip(buckets, response['docs']):
+            if not doc.get('found'):  # maybe the post is not in the ES, ignore
                 continue
 
+            link = doc['_source'].get('link', None)
+            if link:  # given post has a link, save it
+                popularLinks[link] = bucket['doc_count']
+
             if len(popularLinks) >= count:  # we've got our desired count
                 break
 
@@ -994,7 +1300,7 @@ class Analyzer:
         """
 
         # Fetch all author's posts and analyze the results here
-        ess = self.get_es_search()
+        ess = self.get_es_search(self.doc_type_post)
 
         # Fetch only the 'link' field
         ess = ess.params(fields=['link'], size=status_count)
@@ -1002,27 +1308,23 @@ class Analyzer:
 
         authorFilter = F('term', author=author_id) & F('exists', field='link')
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=authorFilter)
+        response = self.execute_es_request(ess, es_filter=authorFilter)
         if not response.success():
             raise RuntimeError('Unable to complete the request')
 
-        domains = {}
+        domains = collections.Counter()
         for post in response.hits:
-            # Parse the url and extract the domain
-            res = urllib.parse.urlparse(post['link'][0])  # '[0]' because a list is returned
+            # Parse the url and extract the domain (urlsplit is cheaper than urlparse)
+            res = urllib.parse.urlsplit(post['link'][0])  # '[0]' because a list is returned
             domain = res.netloc.replace("www.", "", 1)  # erase 'www.'
 
             if STRIP_DOMAINS:  # Strip to a top level domain, e.g. blog.ihned.cz --> ihned.cz
-                parts = len(domain.split('.'))  # count of parts delimited by dot
-                if parts > 2:  # we had some subdomains
-                    splitDomain = domain.split('.')
+                splitDomain = domain.split('.')
+                if len(splitDomain) > 2:  # we had some subdomains
                     domain = "{0}.{1}".format(splitDomain[-2], splitDomain[-1])  # take two top level elements
-            if domain not in domains:
-                domains[domain] = 1
-            else:
-                domains[domain] += 1
+            domains[domain] += 1
 
-        return domains
+        return dict(domains)
 
 
     def get_average_interactions_per_fan(self, author_id):
@@ -1046,7 +1348,7 @@ class Analyzer:
         """
 
         fans = self.get_author_fan_count(author_id)
-        likes = self.get_count_all_likes(author_id)
+        likes = self.get_interaction_counts(author_id)['likes']
 
         return likes / fans
 
@@ -1059,7 +1361,7 @@ class Analyzer:
         """
 
         fans = self.get_author_fan_count(author_id)
-        comments = self.get_count_all_comments(author_id)
+        comments = self.get_interaction_counts(author_id)['comments']
 
         return comments / fans
 
@@ -1077,6 +1379,44 @@ class Analyzer:
         return shares / fans
 
 
+    def get_interaction_counts(self, author_id):
+        """ Return interaction counts for the author, all from a single request
+
+        One search with a filters aggregation gives the total plus the per-type
+        like/comment counts, so the per-fan averages don't need a separate
+        count request each. The result is cached per author.
+
+        :param author_id: user ID you want to analyze
+        :return: dict with 'interactions', 'likes' and 'comments' counts
+        """
+
+        if author_id not in self._interaction_counts_cache:
+            statusAuthorFilter = F('term', status_author=author_id)
+            countAggs = {
+                'by_type': {
+                    'filters': {
+                        'filters': {
+                            'like': {'term': {'type': 'like'}},
+                            'comment': {'term': {'type': 'comment'}},
+                        }
+                    }
+                }
+            }
+
+            query = self.get_es_search().filter(statusAuthorFilter).to_dict()['query']
+            body = {'query': query, 'size': 0, 'aggs': countAggs}
+            response = self.es.search(index=self.index, doc_type=self.doc_type_interaction, body=body)
+
+            buckets = response['aggregations']['by_type']['buckets']
+            self._interaction_counts_cache[author_id] = {
+                'interactions': response['hits']['total'],
+                'likes': buckets['like']['doc_count'],
+                'comments': buckets['comment']['doc_count'],
+            }
+
+        return self._interaction_counts_cache[author_id]
+
+
     def get_count_interactions(self, author_id):
         """ Return number of people, who interacted with the author's content
 
@@ -1084,32 +1424,24 @@ class Analyzer:
         :return total interaction count (int)
         """
 
-        ess = self.get_es_search()
-        # Get number of interactions, where the status_author is our given one
-        ess = ess.params(size=0)  # do not return hits, just the count
-        statusAuthorFilter = F('term', status_author=author_id)
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
-
-        return response.hits.total
+        return self.get_interaction_counts(author_id)['interactions']
 
 
     def get_count_post_reach(self, post_id):
         """ Return number of people, who interacted with the author's content
 
-        :param author_id: user ID you want to analyze
+        :param post_id: post ID you want to analyze
         :return total number of unique people who interacted
         """
 
-        #TODO fix
-        ess = self.get_es_search()
-        # Get number of interactions, where the status_author is our given one
-        ess = ess.params(size=0)  # do not return hits, just the count
-        statusAuthorFilter = F('term', status_author=post_id)
-
-        response = self.execute_es_request(ess, doc_type=self.doc_type_interaction, es_filter=statusAuthorFilter)
+        # Cardinality aggregation lets Elasticsearch count the unique
+        # interaction authors server-side (HyperLogLog), instead of the
+        # previous hits.total which counted interactions, not people
+        statusFilter = F('term', status_id=post_id)
+        reachAgg = {'reach': {'cardinality': {'field': 'author', 'precision_threshold': 40000}}}
 
-        return response.hits.total
+        aggregations = self.execute_es_aggregation(self.doc_type_interaction, statusFilter, reachAgg)
+        return aggregations['reach']['value']
 
 
     def get_comments_time_deltas(self, author_id, status_count=1000):
@@ -1117,23 +1449,33 @@ class Analyzer:
 
         :param author_id: author's ID
         :param status_count: how many last statuses you want to analyze
-        :return: list of deltas (in seconds)
+        :return: array of deltas in seconds (numpy.ndarray)
         """
 
         posts = self.get_posts(author_id, status_count)
 
+        # Fetch the comment timestamps for all posts in one batched request
+        responses = self.batch_interactions_for_posts([ post['id'] for post in posts ],
+                                                      interaction_type='comment',
+                                                      fields=['created_time'])
+
         deltas = []
-        for post in posts:
-            postCreated = dateutil.parser.parse(post['created_time'])
-            comments = self.get_comments_for_post(post['id'])
-            for comment in comments:
-                commentCreated = dateutil.parser.parse(comment['created_time'])
-                delta = commentCreated - postCreated
-                if delta.total_seconds() < 0:  # invalid value, ignore it
-                    continue
-                deltas.append(delta.total_seconds())
+        for post, resp in zip(posts, responses):
+            commentTimes = [ hit['fields']['created_time'][0] for hit in resp['hits']['hits'] ]
+            if not commentTimes:
+                continue
 
-        return deltas
+            # datetime64 subtraction computes all deltas of the post in one go.
+            # The '+0000' suffix is dropped, all the timestamps are UTC anyway.
+            postCreated = numpy.datetime64(post['created_time'][:19], 's')
+            commentCreated = numpy.array([ time[:19] for time in commentTimes ], dtype='datetime64[s]')
+            postDeltas = (commentCreated - postCreated).astype(numpy.int64)
+            deltas.append(postDeltas[postDeltas >= 0])  # negative values are invalid, ignore them
+
+        if not deltas:
+            return numpy.empty(0, dtype=numpy.int64)
+
+        return numpy.concatenate(deltas)
 
 
     def get_average_comments_time_delta(self, author_id, status_count=1000):
@@ -1145,7 +1487,7 @@ class Analyzer:
         """
 
         deltas = self.get_comments_time_deltas(author_id, status_count)
-        return sum(deltas) / len(deltas)
+        return float(numpy.mean(deltas))
 
 
     def get_posts_time_distribution(self, author_id, status_count=1000):
@@ -1158,12 +1500,12 @@ class Analyzer:
 
         postCount = self.get_count_all_posts(author_id)
 
-        ess = self.get_es_search()
+        ess = self.get_es_search(self.doc_type_post)
         ess = ess.sort('-created_time')  # sort from newest to oldest
         ess = ess.params(fields=['created_time'], size=status_count)
         statusAuthorLikeFilter = F('term', author=author_id)
 
-        response = self.execute_es_request(ess, doc_type=self.doc_type_post, es_filter=statusAuthorLikeFilter)
+        response = self.execute_es_request(ess, es_filter=statusAuthorLikeFilter)
 
         if not response.success():
             raise RuntimeError('Request failed')
@@ -1172,21 +1514,20 @@ class Analyzer:
         for hit in response.hits:
             times.append(hit['created_time'][0])  # '[0]' because a list is returned
 
-        # Initialize datetime lists to zero
-        days = 7 * [0]
-        hours = 24 * [0]
-        minutes = 60 * [0]
+        # Bucketize with numpy instead of parsing each timestamp in Python.
+        # The created_time strings always carry a '+0000' suffix, so dropping
+        # the offset keeps the same (UTC) wall-clock values.
+        created = numpy.array([time[:19] for time in times], dtype='datetime64[s]')
 
-        for time in times:
-            time = dateutil.parser.parse(time)
-            days[time.weekday()] += 1
-            hours[time.hour] += 1
-            minutes[time.minute] += 1
+        # Epoch day 0 (1970-01-01) was a Thursday, i.e. weekday() == 3
+        weekdays = (created.astype('datetime64[D]').astype(numpy.int64) + 3) % 7
+        hourOfDay = created.astype('datetime64[h]').astype(numpy.int64) % 24
+        minuteOfHour = created.astype('datetime64[m]').astype(numpy.int64) % 60
 
-        # Normalize the values
-        days = [ v / postCount for v in days]
-        hours = [v / postCount for v in hours]
-        minutes = [v / postCount for v in minutes]
+        # Count occurrences per bucket and normalize the values
+        days = (numpy.bincount(weekdays, minlength=7) / postCount).tolist()
+        hours = (numpy.bincount(hourOfDay, minlength=24) / postCount).tolist()
+        minutes = (numpy.bincount(minuteOfHour, minlength=60) / postCount).tolist()
 
         return days, hours, minutes
 
@@ -1199,7 +1540,10 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
         if len(author_ids) > 20:
             print("Too many authors given, analyzing only first 20")
             author_ids = author_ids[:20]
@@ -1220,29 +1564,19 @@ class Analyzer:
 
             # Get deltas in seconds and create hourly buckets
             deltas = self.get_comments_time_deltas(authorId, status_count)
-            # Fill buckets
             maxHour = 24*3  # three days
-            buckets = [0] * maxHour
-            overValues = 0
-
-            for delta in deltas:
-                hours = int(delta / (60*60))
-                if hours >= maxHour:  # crop too high values
-                    overValues += 1
-                    continue
-                try:
-                    buckets[hours] += 1
-                except IndexError:
-                    continue  # ignore potential off values
-
-            buckets.append(overValues)
-
-            # Transform values into percentages
-            bucketSum = sum(buckets)
-            for i, value in enumerate(buckets):
-                buckets[i] = 100 * value / bucketSum
-
-            xAxis = [x for x in range(len(buckets))]
+
+            # Fill the buckets with a vectorized histogram instead of a Python loop
+            hours = (numpy.asarray(deltas, dtype=numpy.int64) // (60*60))
+            overValues = int((hours >= maxHour).sum())  # crop too high values
+            buckets = numpy.bincount(hours[hours < maxHour], minlength=maxHour)
+            buckets = numpy.append(buckets, overValues)
+
+            # Transform values into percentages (one vectorized pass instead of a Python loop)
+            buckets = buckets.astype(numpy.float64)
+            buckets = 100 * buckets / buckets.sum()
+
+            xAxis = numpy.arange(len(buckets))
             xTicks = [ str(x) for x in range(len(buckets)) ]
             xTicks[-1] = ">{0}".format(maxHour)
 
@@ -1259,7 +1593,10 @@ class Analyzer:
             splot.get_xticklabels()[-1].set_visible(True)
 
             pyplot.ylim(ymin=0)  # start y-axis at 0
-            pyplot.legend()
+
+        # Build the legend once after all lines exist; matplotlib rebuilds the
+        # whole legend artist on every call, so per-author calls were quadratic
+        pyplot.legend()
 
         pyplot.tight_layout()
         pyplot.subplots_adjust(top=0.88)  # make space for the title
@@ -1269,7 +1606,7 @@ class Analyzer:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
+        pyplot.savefig(filename)
         pyplot.close(pyplot.gcf())
 
 
@@ -1281,7 +1618,10 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
         if len(author_ids) > 20:
             print("Too many authors given, analyzing only first 20")
             author_ids = author_ids[:20]
@@ -1302,31 +1642,34 @@ class Analyzer:
             # Days subplot
             pyplot.subplot(311)
             xTicksDays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            xAxis = [ x for x in range(7) ]
-            yAxis = [ v for v in days ]
+            xAxis = numpy.arange(7)
+            yAxis = days
             pyplot.ylabel('Posts published (%)')
             pyplot.xlabel('Day of the week')
             pyplot.plot(xAxis, yAxis, lineStyle, label=authorName)
-            pyplot.legend()
             pyplot.xticks(xAxis, xTicksDays)
 
             # Hours subplot
             pyplot.subplot(312)
-            xAxis = [ x for x in range(24) ]
-            yAxis = [ v for v in hours ]
+            xAxis = numpy.arange(24)
+            yAxis = hours
             pyplot.ylabel('Posts published (%)')
             pyplot.xlabel('Hour of the day')
             pyplot.xticks(xAxis, xAxis)
             pyplot.plot(xAxis, yAxis, lineStyle, label=authorName)
-            pyplot.legend()
 
             # Minutes subplot
             pyplot.subplot(313)
-            xAxis = [ x for x in range(60) ]
-            yAxis = [ v for v in minutes ]
+            xAxis = numpy.arange(60)
+            yAxis = minutes
             pyplot.ylabel('Posts published (%)')
             pyplot.xlabel('Minute of the day')
             pyplot.plot(xAxis, yAxis, lineStyle, label=authorName)
+
+        # Build each legend once after all lines exist (per-author legend
+        # rebuilds are quadratic in the number of authors)
+        for subplotId in (311, 312, 313):
+            pyplot.subplot(subplotId)
             pyplot.legend()
 
         pyplot.tight_layout()
@@ -1337,10 +1680,34 @@ class Analyzer:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
+        pyplot.savefig(filename)
         pyplot.close(pyplot.gcf())
 
 
+    @staticmethod
+    def _linear_fit(xAxis, values):
+        """ Fit a line through the values using the closed-form least-squares solution
+
+        An order-1 fit doesn't need the SVD machinery behind polyfit; slope and
+        intercept follow directly from the sums in one pass over the data.
+
+        :param xAxis: x values (array-like)
+        :param values: y values (array-like)
+        :return: tuple(slope, intercept, fitted y values)
+        """
+
+        x = numpy.asarray(xAxis, dtype=numpy.float64)
+        y = numpy.asarray(values, dtype=numpy.float64)
+
+        # The mean-centered form avoids the cancellation the raw-sums formula
+        # suffers from once x grows large (x is a post index up to status_count)
+        xCentered = x - x.mean()
+        slope = (xCentered * (y - y.mean())).sum() / (xCentered * xCentered).sum()
+        intercept = y.mean() - slope * x.mean()
+
+        return slope, intercept, slope * x + intercept
+
+
     def plot_likes_distribution(self, author_ids, status_count=1000, sub_dir=None):
         """ Plot likes distribution over posts
 
@@ -1349,7 +1716,10 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
         if len(author_ids) > 20:
             print("Too many authors given, analyzing only first 20")
             author_ids = author_ids[:20]
@@ -1367,16 +1737,16 @@ class Analyzer:
             lineStyle = self._get_line_style()
 
             posts = self.get_posts(authorId, status_count)
-            postLikes = []
-            postDates = []
-            for post in posts:
-                likes = self.get_count_likes_for_post(post['id'])
-                postLikes.append(likes)
-                postDates.append(dateutil.parser.parse(post['created_time']))
-
-            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse the list
+            # One batched request instead of a count request per post
+            postLikes = self.get_count_likes_for_post([ post['id'] for post in posts ])
+            # One datetime64 array instead of per-post datetime objects; date2num
+            # converts the whole array at once (the '+0000' suffix is dropped, all UTC)
+            postDates = numpy.array([ post['created_time'][:19] for post in posts ],
+                                    dtype='datetime64[s]')
+
+            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse
             postLikes.reverse()
-            postDates.reverse()
+            postDates = postDates[::-1]  # a view, no copy
 
             # Plot posts with date stamps
             pyplot.subplot(211)
@@ -1385,22 +1755,24 @@ class Analyzer:
             pyplot.ylabel('Likes')
             postDates = matplotlib.dates.date2num(postDates)
             pyplot.plot_date(postDates, postLikes, lineStyle, label=authorName)
-            pyplot.legend()
 
             # Plot posts evenly distributed
             pyplot.subplot(212)
-            xAxis = [ x for x in range(len(postLikes)) ]
+            xAxis = numpy.arange(len(postLikes))
             pyplot.title('Change of post likes')
             pyplot.xlabel('Post number')
             pyplot.ylabel('Likes')
             pyplot.plot(xAxis, postLikes, lineStyle, label=authorName)
 
             # Linear regression curve
-            coefs = poly.polyfit(xAxis, postLikes, 1)
-            ffit = poly.polyval(xAxis, coefs)
-            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, coefs[1], coefs[0])
+            slope, intercept, ffit = self._linear_fit(xAxis, postLikes)
+            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, slope, intercept)
             pyplot.plot(xAxis, ffit, self._get_line_style(), label=linRegLabel)
 
+        # Build each legend once after all lines exist (per-author legend
+        # rebuilds are quadratic in the number of authors)
+        for subplotId in (211, 212):
+            pyplot.subplot(subplotId)
             pyplot.legend()
 
         pyplot.tight_layout()
@@ -1411,7 +1783,7 @@ class Analyzer:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
+        pyplot.savefig(filename)
         pyplot.close(pyplot.gcf())
 
 
@@ -1423,7 +1795,10 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
 
         # Get author's posts and for each post get comment count
         pyplot.figure(figsize=(10, 10))
@@ -1438,16 +1813,16 @@ class Analyzer:
             lineStyle = self._get_line_style()
 
             posts = self.get_posts(authorId, status_count)
-            postComments = []
-            postDates = []
-            for post in posts:
-                commentCount = self.get_count_comments_for_post(post['id'])
-                postComments.append(commentCount)
-                postDates.append(dateutil.parser.parse(post['created_time']))
-
-            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse the list
+            # One batched request instead of a count request per post
+            postComments = self.get_count_comments_for_post([ post['id'] for post in posts ])
+            # One datetime64 array instead of per-post datetime objects; date2num
+            # converts the whole array at once (the '+0000' suffix is dropped, all UTC)
+            postDates = numpy.array([ post['created_time'][:19] for post in posts ],
+                                    dtype='datetime64[s]')
+
+            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse
             postComments.reverse()
-            postDates.reverse()
+            postDates = postDates[::-1]  # a view, no copy
 
             # Plot posts with date stamps
             pyplot.subplot(211)
@@ -1456,22 +1831,24 @@ class Analyzer:
             pyplot.ylabel('Comments')
             postDates = matplotlib.dates.date2num(postDates)
             pyplot.plot_date(postDates, postComments, lineStyle, label=authorName)
-            pyplot.legend()
 
             # Plot posts evenly distributed
             pyplot.subplot(212)
-            xAxis = [ x for x in range(len(postComments)) ]
+            xAxis = numpy.arange(len(postComments))
             pyplot.title('Change of post comments')
             pyplot.xlabel('Post number')
             pyplot.ylabel('Comments')
             pyplot.plot(xAxis, postComments, lineStyle, label=authorName)
 
             # Linear regression curve
-            coefs = poly.polyfit(xAxis, postComments, 1)
-            ffit = poly.polyval(xAxis, coefs)
-            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, coefs[1], coefs[0])
+            slope, intercept, ffit = self._linear_fit(xAxis, postComments)
+            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, slope, intercept)
             pyplot.plot(xAxis, ffit, self._get_line_style(), label=linRegLabel)
 
+        # Build each legend once after all lines exist (per-author legend
+        # rebuilds are quadratic in the number of authors)
+        for subplotId in (211, 212):
+            pyplot.subplot(subplotId)
             pyplot.legend()
 
         pyplot.tight_layout()
@@ -1482,7 +1859,7 @@ class Analyzer:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
+        pyplot.savefig(filename)
         pyplot.close(pyplot.gcf())
 
 
@@ -1494,7 +1871,10 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
 
         # Get author's posts and for each post get comment count
         pyplot.figure(figsize=(10, 10))
@@ -1509,16 +1889,16 @@ class Analyzer:
             lineStyle = self._get_line_style()
 
             posts = self.get_posts(authorId, status_count)
-            postComments = []
-            postDates = []
-            for post in posts:
-                avgComment = self.get_average_comment_len_for_post(post['id'])
-                postComments.append(avgComment)
-                postDates.append(dateutil.parser.parse(post['created_time']))
-
-            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse the list
+            # One batched request instead of an aggregation request per post
+            postComments = self.get_average_comment_len_for_post([ post['id'] for post in posts ])
+            # One datetime64 array instead of per-post datetime objects; date2num
+            # converts the whole array at once (the '+0000' suffix is dropped, all UTC)
+            postDates = numpy.array([ post['created_time'][:19] for post in posts ],
+                                    dtype='datetime64[s]')
+
+            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse
             postComments.reverse()
-            postDates.reverse()
+            postDates = postDates[::-1]  # a view, no copy
 
             # Plot posts with date stamps
             pyplot.subplot(211)
@@ -1527,22 +1907,24 @@ class Analyzer:
             pyplot.ylabel('Avg comment length')
             postDates = matplotlib.dates.date2num(postDates)
             pyplot.plot_date(postDates, postComments, lineStyle, label=authorName)
-            pyplot.legend()
 
             # Plot posts evenly distributed
             pyplot.subplot(212)
-            xAxis = [ x for x in range(len(postComments)) ]
+            xAxis = numpy.arange(len(postComments))
             pyplot.title("Change of average comment's length")
             pyplot.xlabel('Post number')
             pyplot.ylabel('Avg comment length')
             pyplot.plot(xAxis, postComments, lineStyle, label=authorName)
 
             # Linear regression curve
-            coefs = poly.polyfit(xAxis, postComments, 1)
-            ffit = poly.polyval(xAxis, coefs)
-            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, coefs[1], coefs[0])
+            slope, intercept, ffit = self._linear_fit(xAxis, postComments)
+            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, slope, intercept)
             pyplot.plot(xAxis, ffit, self._get_line_style(), label=linRegLabel)
 
+        # Build each legend once after all lines exist (per-author legend
+        # rebuilds are quadratic in the number of authors)
+        for subplotId in (211, 212):
+            pyplot.subplot(subplotId)
             pyplot.legend()
 
         pyplot.tight_layout()
@@ -1553,7 +1935,7 @@ class Analyzer:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
+        pyplot.savefig(filename)
         pyplot.close(pyplot.gcf())
 
 
@@ -1565,11 +1947,23 @@ class Analyzer:
         :param sub_dir: sub directory to save the plot in, created if necessary
         """
 
+        pyplot = GetPyplot()
+
         author_ids = self._get_author_id_list(author_ids)
+        self.get_author_docs(author_ids)  # warm the author cache with a single mget
 
-        # Get author's posts and for each post get comment count
-        pyplot.figure(figsize=(10,10))
-        pyplot.suptitle('Sentiment of comments over time')
+        # Use the object-oriented API: create the figure and both subplots once
+        # instead of re-resolving them through the pyplot state machine per author
+        fig, (dateAxes, postAxes) = pyplot.subplots(2, 1, figsize=(10,10))
+        fig.suptitle('Sentiment of comments over time')
+
+        dateAxes.set_title("Comments' sentiment in time")
+        dateAxes.set_xlabel('Date')
+        dateAxes.set_ylabel('Sentiment')
+
+        postAxes.set_title("Change of comments' sentiment")
+        postAxes.set_xlabel('Post number')
+        postAxes.set_ylabel('Sentiment')
 
         self._get_line_style(reset=True)
 
@@ -1580,52 +1974,47 @@ class Analyzer:
             lineStyle = self._get_line_style()
 
             posts = self.get_posts(authorId, status_count)
-            postSentiments = []
-            postDates = []
-            for post in posts:
-                postSentiment = self.get_sentiment_for_post(post['id'])
-                postSentiments.append(postSentiment)
-                postDates.append(dateutil.parser.parse(post['created_time']))
-
-            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse the list
+            # One batched request instead of an aggregation request per post
+            postSentiments = self.get_sentiment_for_post([ post['id'] for post in posts ])
+            # One datetime64 array instead of per-post datetime objects; date2num
+            # converts the whole array at once (the '+0000' suffix is dropped, all UTC)
+            postDates = numpy.array([ post['created_time'][:19] for post in posts ],
+                                    dtype='datetime64[s]')
+
+            # We received the posts in newest to oldest order, but we want to plot the oldest first --> reverse
             postSentiments.reverse()
-            postDates.reverse()
+            postDates = postDates[::-1]  # a view, no copy
 
-            # Plot posts with date stamps
-            pyplot.subplot(211)
-            pyplot.title("Comments' sentiment in time")
-            pyplot.xlabel('Date')
-            pyplot.ylabel('Sentiment')
+            # Plot posts with date stamps. The data layers are rasterized: with
+            # status_count points per author the pure-vector SVG gets huge and
+            # slow to serialize, while axes, labels and legend stay vector
             postDates = matplotlib.dates.date2num(postDates)
-            pyplot.plot_date(postDates, postSentiments, lineStyle, label=authorName)
-            pyplot.legend()
+            dateAxes.plot_date(postDates, postSentiments, lineStyle, label=authorName, rasterized=True)
 
             # Plot posts evenly distributed
-            pyplot.subplot(212)
-            xAxis = [ x for x in range(len(postSentiments)) ]
-            pyplot.title("Change of comments' sentiment")
-            pyplot.xlabel('Post number')
-            pyplot.ylabel('Sentiment')
-            pyplot.plot(xAxis, postSentiments, lineStyle, label=authorName)
+            xAxis = numpy.arange(len(postSentiments))
+            postAxes.plot(xAxis, postSentiments, lineStyle, label=authorName, rasterized=True)
 
             # Linear regression curve
-            coefs = poly.polyfit(xAxis, postSentiments, 1)
-            ffit = poly.polyval(xAxis, coefs)
-            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, coefs[1], coefs[0])
-            pyplot.plot(xAxis, ffit, self._get_line_style(), label=linRegLabel)
+            slope, intercept, ffit = self._linear_fit(xAxis, postSentiments)
+            linRegLabel = "{0} lin. reg. ({1:.2f}x{2:+.2f})".format(authorName, slope, intercept)
+            postAxes.plot(xAxis, ffit, self._get_line_style(), label=linRegLabel)
 
-            pyplot.legend()
+        # Build each legend once, after all the lines exist; matplotlib rebuilds
+        # the whole legend on every call, so per-author calls were quadratic
+        dateAxes.legend()
+        postAxes.legend()
 
-        pyplot.tight_layout()
-        pyplot.subplots_adjust(top=0.88)  # make space for the title
+        fig.tight_layout()
+        fig.subplots_adjust(top=0.88)  # make space for the title
 
         filename = "comment_sentiment_distribution.svg"
         if sub_dir:
             os.makedirs(sub_dir, exist_ok=True)
             filename = os.path.join(sub_dir, filename)
 
-        pyplot.savefig(filename, dpi=600)
-        pyplot.close(pyplot.gcf())
+        fig.savefig(filename)
+        pyplot.close(fig)
 
 
     def print_latest_post(self, author_id):
@@ -1637,6 +2026,33 @@ class Analyzer:
             print("\tNo posts")
 
 
+    @staticmethod
+    def _write_sorted_counts(fp, counts, top=None):
+        """ Write 'key<padding>count' lines, sorted by count (descending), in one write
+
+        The whole block is built in memory and handed to the file object at once,
+        instead of going through the write path line by line. With 'top' set, only
+        the K biggest entries are selected (heap selection, O(N log K) instead of
+        a full sort) and the alignment considers just those.
+
+        :param fp: file object to write into
+        :param counts: dict mapping keys to occurrence counts
+        :param top: write only this many of the biggest entries (optional)
+        """
+
+        if top is not None:
+            items = heapq.nlargest(top, counts.items(), key=operator.itemgetter(1))
+        else:
+            items = sorted(counts.items(), key=operator.itemgetter(1), reverse=True)
+
+        # Get the longest printed key, for alignment
+        longest = max( (len(k) for k, v in items) ) + 1
+
+        # Left-align with a format width instead of building a padding string per line
+        lines = [ "{0:<{1}}{2}\n".format(k, longest, v) for k, v in items ]
+        fp.write(''.join(lines))
+
+
     def save_followers_most_active(self, author_id, filename=None, sub_dir=None):
         """ Save most published domains by the user
 
@@ -1658,13 +2074,8 @@ class Analyzer:
             fp.write("Total post count: {0}\n\n".format(postCount))
 
             followers = self.get_followers_most_active(author_id, 100)
-            # Get the longest key, for alignment
-            longest = max( map(len, followers) ) + 1
-
             # Print most active follower with a number of occurrences, e.g.: '1245636 507'
-            for k in sorted(followers, key=followers.get, reverse=True):
-                spaces = ' ' * (longest - len(k))
-                fp.write("{0}{1}{2}\n".format(k, spaces, followers[k]))
+            self._write_sorted_counts(fp, followers)
 
 
     def save_domains_most_published(self, author_id, filename=None, sub_dir=None, status_count=1000):
@@ -1687,13 +2098,9 @@ class Analyzer:
             fp.write("Most published domains by user {0}\n\n".format(author_id))
             domains = self.get_domains_most_published(author_id, status_count=status_count)
 
-            # Get the longest key, for alignment
-            longest = max( map(len, domains) ) + 1
-
-            # Print most published domain with a number of occurrences, e.g.: 'facebook.com 507'
-            for k in sorted(domains, key=domains.get, reverse=True):
-                spaces = ' ' * (longest - len(k))
-                fp.write("{0}{1}{2}\n".format(k, spaces, domains[k]))
+            # Print most published domains with a number of occurrences, e.g.: 'facebook.com 507'.
+            # Cap the output at 100 domains, like the other 'most ...' reports
+            self._write_sorted_counts(fp, domains, top=100)
 
 
     def save_links_most_popular(self, author_id, filename=None, sub_dir=None):
@@ -1715,13 +2122,8 @@ class Analyzer:
             fp.write("Most popular links published by user {0}\n\n".format(author_id))
             links = self.get_links_most_popular(author_id, 100)
 
-            # Get the longest key, for alignment
-            longest = max( map(len, links) ) + 1
-
             # Print most popular links with a number of occurrences, e.g.: 'facebook.com/1234 507'
-            for k in sorted(links, key=links.get, reverse=True):
-                spaces = ' ' * (longest - len(k))
-                fp.write("{0}{1}{2}\n".format(k, spaces, links[k]))
+            self._write_sorted_counts(fp, links)
 
 
     def save_posts_most_popular(self, author_id, filename=None, sub_dir=None):
@@ -1743,13 +2145,8 @@ class Analyzer:
             fp.write("Most popular posts published by user {0}\n\n".format(author_id))
             posts = self.get_posts_most_popular(author_id, 100)
 
-            # Get the longest key, for alignment
-            longest = max( map(len, posts) ) + 1
-
-            # Print most published domain with a number of occurrences, e.g.: 'facebook.com 507'
-            for k in sorted(posts, key=posts.get, reverse=True):
-                spaces = ' ' * (longest - len(k))
-                fp.write("{0}{1}{2}\n".format(k, spaces, posts[k]))
+            # Print most popular post with a number of occurrences, e.g.: '123_456 507'
+            self._write_sorted_counts(fp, posts)
 
 
     def save_overall_stats(self, author_id, filename=None, sub_dir=None):
@@ -1882,7 +2279,7 @@ class Analyzer:
         :param sub_dir: sub directory to save the file in, it's created if necessary
         :param min_interactions: percentage of the minimum interactions over all posts (default: 0.05, i.e 5%)
         """
-        if not type(author_ids) is list and not type(author_ids) is tuple:
+        if not isinstance(author_ids, (list, tuple)):
             author_ids = [author_ids]
 
         if not filename:
@@ -1902,9 +2299,23 @@ class Analyzer:
 
         print("done")
 
+    # Names of all plot methods, used by save_plots to fan the work out over processes
+    PLOT_METHODS = (
+        'plot_posts_time_distribution',
+        'plot_likes_distribution',
+        'plot_comments_distribution',
+        'plot_comment_len_distribution',
+        'plot_comment_sentiment_distribution',
+        'plot_comments_delta_distribution',
+    )
+
     def save_plots(self, author_ids, sub_dir, status_count=1000):
         """ Save all available plots for given author(s)
 
+        Each plot renders in its own process: matplotlib rendering is CPU bound
+        and its global state isn't thread safe, but separate processes (each with
+        its own Analyzer and figure state) draw the six plots concurrently.
+
         :param author_ids: ID of the author(s) (string or list/tuple)
         :param sub_dir: where to save the results
         :param status_count: how many last statuses you want to analyze
@@ -1912,16 +2323,40 @@ class Analyzer:
 
         print("Saving plots for specified author(s)... ", end='', flush=True)
 
-        self.plot_posts_time_distribution(author_ids, status_count, sub_dir=sub_dir)
-        self.plot_likes_distribution(author_ids, status_count, sub_dir=sub_dir)
-        self.plot_comments_distribution(author_ids, status_count, sub_dir=sub_dir)
-        self.plot_comment_len_distribution(author_ids, status_count, sub_dir=sub_dir)
-        self.plot_comment_sentiment_distribution(author_ids, status_count, sub_dir=sub_dir)
-        self.plot_comments_delta_distribution(author_ids, status_count, sub_dir=sub_dir)
+        tasks = [ (plotMethod, author_ids, status_count, sub_dir, self.index, self.data_source, self.es_address)
+                  for plotMethod in self.PLOT_METHODS ]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            # Consume the iterator so worker exceptions propagate here
+            list(executor.map(SavePlotWorker, tasks))
 
         print("done")
 
 
+def SavePlotWorker(args):
+    """ Process pool worker: render one plot with a process-local Analyzer
+
+    The Analyzer (with its Elasticsearch client and thread pool) can't be
+    pickled, so each worker builds its own from the constructor arguments.
+
+    :param args: tuple(plot method name, author_ids, status_count, sub_dir, index, data_source, es_address)
+    """
+
+    plotMethod, authorIds, statusCount, subDir, index, dataSource, esAddress = args
+    analyzer = Analyzer(index=index, data_source=dataSource, es_address=esAddress)
+    getattr(analyzer, plotMethod)(authorIds, statusCount, sub_dir=subDir)
+
+
+def SaveTextResultsWorker(args):
+    """ Process pool worker: save the text results of one author
+
+    :param args: tuple(author_id, sub_dir, status_count, index, data_source, es_address)
+    """
+
+    authorId, subDir, statusCount, index, dataSource, esAddress = args
+    analyzer = Analyzer(index=index, data_source=dataSource, es_address=esAddress)
+    analyzer.save_text_results(authorId, subDir, status_count=statusCount)
+
+
 def DumpResponse(response):
     """ Print given response object
 
@@ -1929,13 +2364,20 @@ def DumpResponse(response):
     """
 
     if hasattr(response, 'to_dict') and callable(getattr(response, 'to_dict')):
-        respStr = json.dumps(response.to_dict(), indent=2, ensure_ascii=False)
-    elif type(response) is dict:
-        respStr = json.dumps(response, indent=2, ensure_ascii=False)
+        obj = response.to_dict()
+    elif isinstance(response, dict):
+        obj = response
     else:
-        respStr = str(response)
+        obj = None
 
-    print("Response:\n", respStr)
+    sys.stdout.write("Response:\n ")
+    if obj is None:
+        sys.stdout.write(str(response))
+    else:
+        # Serialize straight into stdout instead of building the (potentially
+        # multi-megabyte) string first
+        json.dump(obj, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
 
 
 def Main():
@@ -1970,15 +2412,21 @@ def Main():
             analyzer.print_latest_post(authorId)
             continue
 
-        if not ONLY_PLOTS:
-            # Save text results/stats for the given author
+    if PRINT_LATEST_POST:  # nothing more to do, exit
+        return 0
+
+    if not ONLY_PLOTS:
+        # Save text results/stats for the given authors, one worker process per
+        # author (the per-author reports are fully independent of each other)
+        textTasks = []
+        for authorId, authorName in zip(authors, authorNames):
             authorDataDir = "stats_{0}".format(authorName)
             print("Results will be stored in the '{0}' directory".format(authorDataDir))
-            analyzer.save_text_results(authorId, authorDataDir, status_count=POST_COUNT)
-
+            textTasks.append( (authorId, authorDataDir, POST_COUNT, ES_INDEX, 'fb', ES_ADDRESS) )
 
-    if PRINT_LATEST_POST:  # nothing more to do, exit
-        return 0
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            # Consume the iterator so worker exceptions propagate here
+            list(executor.map(SaveTextResultsWorker, textTasks))
 
     # Where to save the compound results (for one author the directory is the same as for the text results)
     compoundDataDir = "stats_{0}".format('_'.join(authorNames))
@@ -6,9 +6,19 @@
     with all required fields.
 """
 
-import sys, os, json, argparse
+import sys, os, re, json, argparse
+import concurrent.futures
+
+# Parse with orjson (a much faster C implementation) when it's installed; the
+# stdlib json.loads accepts the same bytes input and returns the same structures
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 from elasticsearch import Elasticsearch
+from elasticsearch import helpers as es_helpers
 
 from gender.genderize import AnalyzeGender
 
@@ -17,12 +27,17 @@ from gender.genderize import AnalyzeGender
 # Whether to add a sentiment field to data units
 ADD_SENTIMENT = True
 
-# Path to load
-PATH = ''
-# Elasticsearch address string
-ES_ADDRESS = None
-# Elasticsearch index
-ES_INDEX = 'xjirou07'
+# Elasticsearch client options: keep-alive connections for the bulk requests,
+# a bigger pool and retries instead of dying on a slow cluster
+ES_OPTIONS = {
+    'maxsize': 32,
+    'timeout': 60,
+    'retry_on_timeout': True,
+    'max_retries': 3,
+}
+
+# Default Elasticsearch index
+DEFAULT_ES_INDEX = 'xjirou07'
 
 
 if ADD_SENTIMENT:
@@ -31,36 +46,37 @@ if ADD_SENTIMENT:
 
 
 def ParseArguments():
-    """ Parse command line arguments and set appropriate global flags """
+    """ Parse command line arguments
+
+    The parsed namespace is the loader configuration; it is passed around
+    explicitly instead of being copied into module globals, so Main can also
+    be driven from another module with a hand-built configuration.
+
+    :return: configuration namespace with 'path', 'es_addr' and 'es_index'
+    """
 
-    global ES_ADDRESS, PATH, ES_INDEX
     parser = argparse.ArgumentParser(description="Load data into the Elasticsearch instance")
     parser.add_argument('PATH', help="File or directory from which you want to load data")
     parser.add_argument('-a', '--es-address', dest='es_addr', default=None,
                         help="Elasticsearch address. String in the format of 'host[:port]'")
-    parser.add_argument('-i', '--es-index', dest='es_index', default=ES_INDEX,
+    parser.add_argument('-i', '--es-index', dest='es_index', default=DEFAULT_ES_INDEX,
                         help="Index under which all data are stored in Elasticsearch.")
 
     args = parser.parse_args()
-    PATH = args.PATH
-    ES_ADDRESS = args.es_addr
-    ES_INDEX = args.es_index
+    args.path = args.PATH
+    return args
+
+
+# Document type tokens the data file names are matched against; the named group
+# that matched gives the type directly
+DOCTYPE_RE = re.compile(r'(?P<interaction>ints|interactions?)|(?P<post>posts?)|(?P<user>user_(?:page_)?info)')
 
 
 def GetDocTypeFromFilename(filename):
     """ Return a string representing given document type """
 
-    interactionStrings = ('ints', 'interactions', 'interaction')
-    postStrings = ('posts', 'post')
-
-    if any(s in filename for s in interactionStrings):
-        return 'interaction'
-    elif any(s in filename for s in postStrings):
-        return 'post'
-    elif 'user_info' in filename or 'user_page_info' in filename:
-        return 'user'
-    else:
-        return None
+    match = DOCTYPE_RE.search(filename)
+    return match.lastgroup if match else None
 
 
 def GetOriginFromDataUnit(data_unit):
@@ -80,78 +96,153 @@ def GetOriginFromDataUnit(data_unit):
     return origin
 
 
-def AddExtraFieldsToUnit(data_unit):
-    """ Add extra (computed) fields to the data unit """
+def AddExtraFieldsToUnits(data):
+    """ Add extra (computed) fields to all data units of a file
+
+    The sentiment is classified for the whole batch in one call: the vectorizer
+    and the classifier amortize much better over a list of messages than over
+    one message at a time.
+    """
+
+    # One pass over the units, with each dict value looked up only once
+    unitsWithMessage = []
+    messages = []
+    for unit in data:
+        message = unit.get('message')
+        if message:
+            # Calculate length of the message
+            unit['message_len'] = len(message)
+            unitsWithMessage.append(unit)
+            messages.append(message)
+
+        firstName = unit.get('first_name')
+        if firstName:  # user info data unit
+            unit['gender'] = AnalyzeGender(firstName, unit.get('last_name'))
+
+    if ADD_SENTIMENT and messages:
+        # Store sentiment of the messages, classified in one batch
+        sentiments = sentiment.AnalyzeSentiment(messages, CLASSIFIER)
+        for unit, label in zip(unitsWithMessage, sentiments):
+            unit['message_sentiment'] = label
 
-    if data_unit.get('message', None):
-        # Calculate length of the message
-        data_unit['message_len'] = len(data_unit.get('message'))
-        if ADD_SENTIMENT:
-            # Store sentiment of the message
-            data_unit['message_sentiment'] = sentiment.AnalyzeSentiment(data_unit.get('message'), CLASSIFIER)[0]
+    return data
 
-    if data_unit.get('first_name', None):  # user info data unit
-        data_unit['gender'] = AnalyzeGender(data_unit['first_name'], data_unit.get('last_name', None))
 
-    return data_unit
+def GenerateActions(data, doc_type, es_index):
+    """ Yield a bulk index action for each data unit
 
+    Units without an id are skipped (with a message).
+    """
+
+    for unit in data:
+        unitId = unit.get('id', None)
+        if not unitId:
+            print("\tMissing id, ignoring element")
+            continue
+        # Save the element with an origin prefix, e.g. 'fb_post' or 'tw_interaction'
+        origin = GetOriginFromDataUnit(unit)
+        unitDocType = "{0}_{1}".format(origin, doc_type)
 
-def Main():
-    ParseArguments()
+        yield {
+            '_op_type': 'index',
+            '_index': es_index,
+            '_type': unitDocType,
+            '_id': unitId,
+            '_source': unit,
+        }
+
+
+def ProcessFile(args):
+    """ Process pool worker: parse, enrich and index one data file
+
+    Each worker builds its own Elasticsearch client (clients can't be shared
+    between processes); the index and address come in through the task tuple,
+    since spawned workers don't inherit the parsed command line arguments.
+
+    :param args: tuple(file path, file number, file count, es_address, es_index)
+    :return: number of inserted elements
+    """
+
+    file, fileNum, fileCount, esAddress, esIndex = args
+
+    docType = GetDocTypeFromFilename(os.path.basename(file))
+    if not docType:
+        print("Unknown data type, ignoring file: {0}".format(file))
+        return 0
+    print('Processing data file [{0}/{1}]: {2}'.format(fileNum, fileCount, file))
+
+    # Create Elasticsearch interface
+    if esAddress:
+        es = Elasticsearch(esAddress, **ES_OPTIONS)
+    else:
+        es = Elasticsearch(**ES_OPTIONS)
+
+    with open(file, 'rb') as fp:
+        # Data is expected to be a list of objects
+        data = json_loads(fp.read())
+        if type(data) is not list and type(data) is not tuple:
+            data = [data]
+
+        data = AddExtraFieldsToUnits(data)
+
+        # Save the units through the bulk API, a few thousand per request,
+        # instead of one HTTP round-trip per unit
+        inserted = 0
+        for ok, info in es_helpers.streaming_bulk(es, GenerateActions(data, docType, esIndex),
+                                                  chunk_size=2000, raise_on_error=False):
+            if ok:
+                inserted += 1
+            else:
+                print("\tFailed to index an element: {0}".format(info))
+
+        print("\tInserted {0} '{1}' elements".format(inserted, docType))
+
+    return inserted
+
+
+def Main(config=None):
+    """ Load all data files selected by the configuration
+
+    :param config: configuration namespace (see ParseArguments); parsed from
+                   the command line when not given
+    """
+
+    if config is None:
+        config = ParseArguments()
 
     # Prepare a list of files we want to load
     fileList = []
 
     # Append absolute paths to the file list
-    if PATH:
-        if not os.path.exists(PATH):
-            raise ValueError("Path '{0}' does not exist".format(PATH))
-        if os.path.isdir(PATH):
-            print("Looking for data files in: {0}\n".format(PATH))
-            for file in os.listdir(PATH):
-                # Accept only files with '.json' suffix, not hidden and without 'IGNORE'
-                if not file.endswith('.json') or file.startswith('.') or 'IGNORE' in file:
-                    continue
-                fileList.append( os.path.abspath(os.path.join(os.getcwd(), PATH, file)) )
+    if config.path:
+        if not os.path.exists(config.path):
+            raise ValueError("Path '{0}' does not exist".format(config.path))
+        if os.path.isdir(config.path):
+            print("Looking for data files in: {0}\n".format(config.path))
+            # scandir hands back DirEntry objects with a cached file type, so no
+            # extra stat call per file is needed
+            with os.scandir(config.path) as entries:
+                for entry in entries:
+                    # Accept only files with '.json' suffix, not hidden and without 'IGNORE'
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if not entry.name.endswith('.json') or entry.name.startswith('.') or 'IGNORE' in entry.name:
+                        continue
+                    fileList.append( os.path.abspath(entry.path) )
         else:  # is a file
-            fileList.append( os.path.abspath(os.path.join(os.getcwd(), PATH)) )
-
-    # Create Elasticsearch interface
-    if ES_ADDRESS:
-        es = Elasticsearch(ES_ADDRESS)
-    else:
-        es = Elasticsearch()
+            fileList.append( os.path.abspath(os.path.join(os.getcwd(), config.path)) )
 
     fileList.sort()
 
-    for i, file in enumerate(fileList):
-        docType = GetDocTypeFromFilename(os.path.basename(file))
-        if not docType:
-            print("Unknown data type, ignoring file: {0}".format(file))
-            continue
-        if not os.path.isfile(file):
-            continue
-        print('Processing data file [{0}/{1}]: {2}'.format(i+1, len(fileList), file))
-
-        with open(file, 'r') as fp:
-            # Data is expected to be a list of objects
-            data = json.load(fp)
-            if type(data) is not list and type(data) is not tuple:
-                data = [data]
-            # Save each unit into the index
-            for unit in data:
-                unitId = unit.get('id', None)
-                if not unitId:
-                    print("\tMissing id, ignoring element")
-                    continue
-                # Save the element with an origin prefix, e.g. 'fb_post' or 'tw_interaction'
-                origin = GetOriginFromDataUnit(unit)
-                unitDocType = "{0}_{1}".format(origin, docType)
-                unit = AddExtraFieldsToUnit(unit)
-
-                es.index(ES_INDEX, unitDocType, unit, unitId)
-
-            print("\tInserted {0} '{1}' elements".format(len(data), docType))
+    # Process the files in parallel: parsing and sentiment are CPU bound and the
+    # files are independent, so each one goes to a worker process
+    tasks = [ (file, i+1, len(fileList), config.es_addr, config.es_index) for i, file in enumerate(fileList) ]
+    total = 0
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        for inserted in executor.map(ProcessFile, tasks):
+            total += inserted
+
+    print("\nInserted {0} elements in total".format(total))
 
     return 0
 
@@ -6,12 +6,35 @@
     Facebook downloader
 """
 
-import sys, os, urllib.parse, json, re, copy, datetime, argparse
+import sys, os, urllib.parse, json, re, datetime, argparse, time
+import concurrent.futures
+import collections
+import threading
+import queue
 
 import requests
 
+# Encode/decode with orjson (a much faster C implementation) when it's
+# installed; the stdlib fallbacks produce the same structures and an
+# equivalent prettified format
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps_pretty(obj):
+        # orjson emits UTF-8 bytes directly, no ensure_ascii walk
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps_pretty(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False)  # Do not encode UTF-8 as ASCII
+
 # How many bytes (approximately) a data file has (in bytes)
 DATA_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
+# How long a cached user detail record stays valid (profile fields rarely change)
+USER_CACHE_TTL = 7 * 24 * 3600  # 7 days
 # Where the downloaded data are stored
 DATA_DIR = os.path.join('..', 'data')
 
@@ -34,8 +57,19 @@ APP_SECRET = os.getenv("FACEBOOK_APP_SECRET", None)
 
 # Which GraphAPI version to use
 GRAPH_API_VERSION = '2.9'
+# Request URL bases, precomputed once; endpoints may carry their own version
+# prefix (e.g. 'v2.8/...'), matched by the compiled pattern below
+GRAPH_URL = 'https://graph.facebook.com/'
+GRAPH_URL_VERSIONED = GRAPH_URL + 'v{0}/'.format(GRAPH_API_VERSION)
+VERSIONED_ENDPOINT_RE = re.compile(r'^/?v\d+\.\d+/')
 # How many seconds to wait for the server to respond
 REQUEST_TIMEOUT = 125
+# How many sub-requests to pack into one batch request (GraphAPI allows up to 50,
+# but large batches are more likely to hit the rate limiter)
+GRAPH_BATCH_LIMIT = 25
+# How many batch requests to keep on the wire at once; must stay below the
+# HTTPAdapter pool_maxsize so the connection pool isn't thrashed
+BATCH_MAX_WORKERS = 8
 
 
 def ParseArguments():
@@ -71,22 +105,172 @@ def ParseArguments():
         APP_SECRET = args.app_secret
 
 
+# Finished data files waiting for their background fsync
+_FSYNC_QUEUE = queue.Queue()
+
+
+def _FsyncWorker():
+    """ Background thread flushing finished data files to disk
+
+    fsync blocks for the disk's write latency, which would otherwise stall the
+    network-bound download pipeline in the middle of fetching; here the flush
+    overlaps with the next HTTP requests instead.
+    """
+
+    while True:
+        filename = _FSYNC_QUEUE.get()
+        try:
+            fd = os.open(filename, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print("Failed to fsync data file '{0}': {1}".format(filename, e))
+        _FSYNC_QUEUE.task_done()
+
+
+_fsyncThread = threading.Thread(target=_FsyncWorker, daemon=True)
+_fsyncThread.start()
+
+
+def ScheduleFsync(filename):
+    """ Hand a finished (already closed) data file to the background fsync thread """
+
+    _FSYNC_QUEUE.put(filename)
+
+
+def WaitForFsyncs():
+    """ Block until all scheduled background fsyncs have finished """
+
+    _FSYNC_QUEUE.join()
+
+
+# Next free data-file number per (directory, prefix) pair
+_FILE_COUNTERS = {}
+
+
+def NextDataFilename(data_dir, prefix):
+    """ Return the next free '<prefix>data_N.json' path in the given directory
+
+    The counter for each (directory, prefix) pair is seeded by scanning the
+    directory once and then only incremented, so picking a name is O(1)
+    instead of probing data_0, data_1, ... with an exists() call per slot.
+
+    :param data_dir: directory the data files live in
+    :param prefix: filename prefix, including the trailing underscore
+    :return: path of the next free data file
+    """
+
+    prefix = prefix or ''
+    key = (data_dir, prefix)
+    counter = _FILE_COUNTERS.get(key)
+    if counter is None:
+        # First use for this directory/prefix: seed the counter past any
+        # files left over from previous runs
+        counter = 0
+        fileRe = re.compile(re.escape(prefix) + r'data_(\d+)\.json$')
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                match = fileRe.match(entry.name)
+                if match:
+                    counter = max(counter, int(match.group(1)) + 1)
+
+    _FILE_COUNTERS[key] = counter + 1
+    return os.path.join(data_dir, "{0}data_{1}.json".format(prefix, counter))
+
+
+class JsonListWriter:
+    """ Incremental writer of JSON list data files
+
+    Appends one object at a time into a '<prefix>data_N.json' file, rotating
+    to a new file once the current one grows past max_size. The output format
+    stays a prettified JSON list, but objects hit the disk as they arrive, so
+    memory stays flat and there is no final dump walking a huge list.
+    """
+
+    def __init__(self, data_subdir=None, filename_prefix=None, max_size=DATA_FILE_SIZE):
+        self.dataSubdir = data_subdir
+        self.filenamePrefix = filename_prefix
+        self.maxSize = max_size
+        self.fp = None
+        self.filename = None
+        self.size = 0  # running size of the current file
+
+
+    def append(self, obj):
+        """ Write one object, rotating the data file when it's big enough
+
+        :param obj: Python object you want to save
+        """
+
+        if self.fp is None:
+            self.fp = self._open_file()
+            self.fp.write('[\n')
+        else:
+            self.fp.write(',\n')
+        chunk = json_dumps_pretty(obj)
+        self.fp.write(chunk)
+
+        # Keep a running size counter instead of a stat syscall per append;
+        # counting characters slightly undershoots the on-disk bytes for
+        # non-ASCII content, but the rotation size was approximate anyway
+        self.size += len(chunk) + 2
+        if self.size >= self.maxSize:
+            self.close()
+
+
+    def close(self):
+        """ Finalize and close the current data file (if any) """
+
+        if self.fp is None:
+            return
+        self.fp.write('\n]\n')
+        self.fp.close()
+        self.fp = None
+        self.size = 0
+        # Flush to disk off the download path
+        ScheduleFsync(self.filename)
+        self.filename = None
+
+
+    def _open_file(self):
+        """ Create the data directory if needed and open the next free data file """
+
+        dataDir = DATA_DIR
+        if self.dataSubdir:
+            dataDir = os.path.join(dataDir, self.dataSubdir)
+
+        # Create the directory if necessary
+        if not os.path.isdir(dataDir):
+            if os.path.exists(dataDir):  # it's a regular file, abort
+                raise ValueError("Data directory '%s' cannot be created, there's a file with the same name" % dataDir)
+            os.makedirs(dataDir)
+
+        # Given prefix, append underscore
+        prefix = self.filenamePrefix or ''
+        if prefix and not prefix.endswith('_'):
+            prefix += '_'
+
+        self.filename = NextDataFilename(dataDir, prefix)
+        return open(self.filename, 'w')
+
+
 class GraphApi:
     """ TODO """
 
-    @staticmethod
-    def raw_request(request_url):
+    def raw_request(self, request_url):
         """ Make a raw request on the given URL and return JSON.
 
         Return: JSON as a Python dictionary
         """
 
         try:
-            r = requests.get(request_url.strip(), timeout=REQUEST_TIMEOUT)
+            r = self.session.get(request_url.strip(), timeout=REQUEST_TIMEOUT)
         except:
             print("Exception for raw_request url:", request_url)
             raise
-        return r.json()
+        return json_loads(r.content)
 
 
     def __init__(self, app_id, app_secret):
@@ -98,27 +282,29 @@ class GraphApi:
         if not app_id or not app_secret:
             raise ValueError("Facebook GraphAPI APP_ID or APP_SECRET is missing")
 
+        # All requests go to graph.facebook.com, so share one session with a
+        # connection pool: keep-alive saves a TCP+TLS handshake per request,
+        # which adds up quickly over the paginated endpoints
+        self.session = requests.Session()
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+        # Executor for the batched interaction requests; the fetches are
+        # independent and network bound, so several can be on the wire at once
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+
         # Initialize the token
         self.accessToken = self.access_token_request()
 
 
-    @staticmethod
-    def get_interaction_list_size(list_obj):
-        """ Return the approximate size of the prettified list with interaction objects. """
+    def close(self):
+        """ Close the underlying HTTP session (and its pooled connections) """
 
-        ONE_INTERACTION_SIZE = 273  # approximate size of one prettified interaction JSON
-        return ONE_INTERACTION_SIZE * len(list_obj)
+        self._executor.shutdown()
+        self.session.close()
 
 
-    @staticmethod
-    def get_post_list_size(list_obj):
-        """ Return the approximate size of the prettified list with post objects.
-
-        This is a really rough approximation.
-        """
-
-        ONE_POST_SIZE = 1010  # approximate size of one prettified post JSON
-        return ONE_POST_SIZE * len(list_obj)
+    def __del__(self):
+        self.close()
 
 
     @staticmethod
@@ -146,58 +332,11 @@ class GraphApi:
         if filename_prefix and not filename_prefix.endswith('_'):
             filename_prefix += "_"
 
-        # Find an available filename
-        counter = 0
-        while True:
-            filename = "{0}data_{1}.json".format(filename_prefix, counter)
-            filename = os.path.join(dataDir, filename)
-            if not os.path.exists(filename):
-                break
-            counter += 1
-
+        filename = NextDataFilename(dataDir, filename_prefix)
         with open(filename, 'w') as f:
-            json.dump(obj, f, indent=2, ensure_ascii=False)  # Do not encode UTF-8 as ASCII
-            f.flush()
-            os.fsync(f.fileno())
-
-
-    def append_interaction(self, interaction_list, interaction, data_subdir):
-        """ Append interaction to the list and dumping them to a file when necessary
-
-        :param interaction_list: list of interaction to which you want to append
-        :param interaction: interaction object you want to append
-        :param data_subdir: where to save the data
-        :return: new interaction list
-        """
-
-        interaction_list.append(interaction)
-
-        # Check if we need to dump the data
-        if self.get_interaction_list_size(interaction_list) > DATA_FILE_SIZE:
-            self.save_data(interaction_list, data_subdir=data_subdir, filename_prefix='interaction')
-            interaction_list = []
-
-        return interaction_list
-
-
-    def append_user(self, user_list, user, data_subdir):
-        """ Append user object to the list and dumping them to a file when necessary
-
-        :param user_list: list of users to which you want to append
-        :param user: user object you want to append
-        :param data_subdir: where to save the data
-        :return: new user list
-        """
-
-        user_list.append(user)
-
-        # Check if we need to dump the data
-        # One user data record is approximately the same as as interaction
-        if self.get_interaction_list_size(user_list) > DATA_FILE_SIZE:
-            self.save_data(user_list, data_subdir=data_subdir, filename_prefix='user')
-            user_list = []
-
-        return user_list
+            f.write(json_dumps_pretty(obj))
+        # Flush to disk off the download path
+        ScheduleFsync(filename)
 
 
     def request(self, endpoint, params=None, raw_response=False):
@@ -205,11 +344,10 @@ class GraphApi:
 
         :param endpoint: GraphAPI endpoint for the request (string). It may contain version
         :param params: request query parameters (dictionary, optional)
-        :param raw_response: do not convert the response into Python dictionary (bool, default: False)
+        :param raw_response: return the raw response bytes instead of a parsed dictionary (bool, default: False)
         :return: Request's response JSON (dictionary)
         """
 
-        graphUrl = 'https://graph.facebook.com/'
         endpoint = endpoint.strip()
 
         if params is None:
@@ -220,12 +358,14 @@ class GraphApi:
         if 'access_token' not in params and token is not None:
             params['access_token'] = token
 
-        # If the endpoint doesn't start with version, append the default module version
-        if not bool(re.search('^[/]?v[0-9]\.[0-9]/', endpoint)):
-            graphUrl += 'v{0}/'.format(GRAPH_API_VERSION)
+        # If the endpoint doesn't start with a version, use the default module version
+        if VERSIONED_ENDPOINT_RE.match(endpoint):
+            graphUrl = GRAPH_URL
+        else:
+            graphUrl = GRAPH_URL_VERSIONED
 
         try:
-            r = requests.get(urllib.parse.urljoin(graphUrl, endpoint), params=params, timeout=REQUEST_TIMEOUT)
+            r = self.session.get(urllib.parse.urljoin(graphUrl, endpoint), params=params, timeout=REQUEST_TIMEOUT)
         except:
             print("Exception for graph_request endpoint:", endpoint)
             raise
@@ -233,9 +373,40 @@ class GraphApi:
         #print("Request url\n", r.url)
 
         if raw_response:
-            return r.text
+            return r.content
+
+        return json_loads(r.content)
+
+
+    def batch_request(self, sub_requests):
+        """ Execute several GraphAPI requests in one HTTP round-trip
+
+        Uses the GraphAPI batch endpoint, which accepts up to 50 sub-requests
+        in a single POST and returns their responses in the same order.
+
+        :param sub_requests: list of {'method': ..., 'relative_url': ...} dicts
+        :return: list of response bodies (dictionaries), one per sub-request
+        """
+
+        payload = {
+            'access_token': self.accessToken,
+            'batch': json.dumps(sub_requests),
+            'include_headers': 'false',  # we don't use the per-response headers
+        }
+
+        try:
+            r = self.session.post(GRAPH_URL_VERSIONED, data=payload, timeout=REQUEST_TIMEOUT)
+        except:
+            print("Exception for batch_request with {0} sub-requests".format(len(sub_requests)))
+            raise
+
+        responses = json_loads(r.content)
+        if type(responses) is not list:  # top-level error, e.g. a malformed batch
+            self.response_has_error(responses)
+            return []
 
-        return r.json()
+        # Each sub-response body arrives as a JSON string (None if it failed)
+        return [ json_loads(item['body']) if item else {} for item in responses ]
 
 
     @staticmethod
@@ -302,18 +473,16 @@ class GraphApi:
 
         # First versions of Graph API returned plain text response, later JSON. Let's try both.
         try:
-            tokenJson = json.loads(response)
+            tokenJson = json_loads(response)
             return tokenJson.get('access_token', None)
         except ValueError:
             # We got plain text response in the format 'access_token=REAL_ACCESS_TOKEN'
-            if 'access_token' in response:
-                return response.replace('access_token=', '')  # extract the access token
+            text = response.decode('utf-8', 'replace')
+            if 'access_token' in text:
+                return text.replace('access_token=', '')  # extract the access token
 
         # Some other error, throw an exception
-        err = response.get('error', None)
-        if not err:
-            err = response
-        raise RuntimeError(err)
+        raise RuntimeError(text)
 
 
     def get_all_elements(self, endpoint, params=None):
@@ -356,17 +525,50 @@ class GraphApi:
                                 'last_name', 'location', 'locale'))
         }
 
-        users = []
+        cacheDir = os.path.join(DATA_DIR, '.usercache')
+        os.makedirs(cacheDir, exist_ok=True)
+
+        userWriter = JsonListWriter(data_subdir, 'user')
         try:
             for userId in user_ids:
-                userInfo = self.request(userId, userInfoParams)
-                userInfo['origin'] = 'facebook'
-                if userInfo.get('birthday', None):
-                    userInfo['birthday_format'] = "MM/DD/YYYY"
-
-                users = self.append_user(users, userInfo, data_subdir)
+                userWriter.append(self._get_user_info_cached(userId, userInfoParams, cacheDir))
         finally:
-            self.save_data(users, data_subdir=data_subdir, filename_prefix='user')
+            userWriter.close()
+
+
+    def _get_user_info_cached(self, user_id, params, cache_dir):
+        """ Fetch details of one user, short-circuiting through the on-disk cache
+
+        Repeat crawls see mostly the same interacting users, so details
+        fetched within the last USER_CACHE_TTL seconds are reused from disk
+        instead of hitting the network again.
+
+        :param user_id: ID of the user
+        :param params: request parameters for the user info endpoint
+        :param cache_dir: directory with the cached records
+        :return: user info dictionary
+        """
+
+        cachePath = os.path.join(cache_dir, "{0}.json".format(user_id))
+        try:
+            if time.time() - os.path.getmtime(cachePath) < USER_CACHE_TTL:
+                with open(cachePath, 'rb') as fp:
+                    return json_loads(fp.read())
+        except (OSError, ValueError):
+            pass  # no cache entry (or an unreadable one), fall through to the network
+
+        userInfo = self.request(user_id, params)
+        userInfo['origin'] = 'facebook'
+        if userInfo.get('birthday', None):
+            userInfo['birthday_format'] = "MM/DD/YYYY"
+
+        # Write atomically so an interrupted run can't leave a truncated entry
+        tmpPath = cachePath + '.tmp'
+        with open(tmpPath, 'w') as fp:
+            fp.write(json_dumps_pretty(userInfo))
+        os.replace(tmpPath, cachePath)
+
+        return userInfo
 
 
     def save_author_info(self, author_id, data_subdir):
@@ -393,6 +595,94 @@ class GraphApi:
         self.save_data(authorInfo, data_subdir=data_subdir, filename_prefix='user_page_info')
 
 
+    @staticmethod
+    def _make_interaction(interaction_type, element, post_id, author_id):
+        """ Build one interaction record from a response element
+
+        :param interaction_type: 'comment', 'like' or 'share'
+        :param element: one element from the endpoint response
+        :param post_id: ID of the post the interaction belongs to
+        :param author_id: ID of the post's author
+        :return: interaction dictionary
+        """
+
+        # Build each record in a single dict literal (one BUILD_MAP instead of
+        # a store per field) with every element key read exactly once; this
+        # runs once per interaction, potentially millions of times per author
+        if interaction_type == 'like':
+            # Likes does not have an id, so we need to generate it
+            # Returned (in the graph response) 'id' element is an id of the user who liked the post
+            likeAuthor = element['id']
+            return {
+                'id': f"L_{likeAuthor}_{post_id}",  # L_author_statusId
+                'status_id': post_id,
+                'status_author': author_id,
+                'type': interaction_type,
+                'author': likeAuthor,
+                'origin': 'facebook',
+            }
+
+        # Comment or share
+        interaction = {
+            'id': element['id'],
+            'status_id': post_id,
+            'status_author': author_id,
+            'type': interaction_type,
+            'author': element['from']['id'],
+            'created_time': element['created_time'],
+            'message': element.get('message', ''),
+            'origin': 'facebook',
+        }
+        if interaction_type == 'comment':
+            interaction['like_count'] = element['like_count']
+
+        return interaction
+
+
+    def _submit_interaction_batches(self, pending_requests, in_flight, allow_partial=False):
+        """ Move queued sub-request windows onto the executor, up to the worker limit
+
+        :param pending_requests: queued (post id, interaction type, relative url) triples (mutated)
+        :param in_flight: deque of (window, future) pairs the batches are appended to (mutated)
+        :param allow_partial: also submit a window smaller than GRAPH_BATCH_LIMIT
+        """
+
+        while pending_requests and len(in_flight) < BATCH_MAX_WORKERS:
+            if len(pending_requests) < GRAPH_BATCH_LIMIT and not allow_partial:
+                break
+            window = pending_requests[:GRAPH_BATCH_LIMIT]
+            del pending_requests[:GRAPH_BATCH_LIMIT]
+            subRequests = [ {'method': 'GET', 'relative_url': relativeUrl} for _, _, relativeUrl in window ]
+            in_flight.append( (window, self._executor.submit(self.batch_request, subRequests)) )
+
+
+    def _process_interaction_batch(self, window, bodies, author_id, writer, counts):
+        """ Process the responses of one finished batch of interaction sub-requests
+
+        :param window: list of (post id, interaction type, relative url) triples
+        :param bodies: response bodies returned by batch_request, in window order
+        :param author_id: ID of the author whose posts are being processed
+        :param writer: JsonListWriter the interaction records go to
+        :param counts: per-type interaction counters (dictionary, mutated)
+        :return: follow-up triples for the next pages
+        """
+
+        followUps = []
+        for (postId, interactionType, _), body in zip(window, bodies):
+            self.response_has_error(body)
+            for element in body.get('data', []):
+                counts[interactionType] += 1
+                writer.append(self._make_interaction(interactionType, element, postId, author_id))
+
+            # Feed the next page (if any) back into the queue as a new sub-request
+            nextUrl = body.get('paging', {}).get('next', None)
+            if nextUrl:
+                followUps.append((postId, interactionType,
+                                  nextUrl.replace(GRAPH_URL, '', 1)))
+
+        return followUps
+
+
     def save_full_author_data(self, author_id, data_subdir):
         """ Download all author's data: posts, likes, shares, comments
 
@@ -403,7 +693,7 @@ class GraphApi:
         postParams = {
             'fields': ','.join(('id', 'created_time', 'message', 'link', 'place', 'status_type', 'shares'))
         }
-        shareParams = copy.deepcopy(postParams)
+        shareParams = dict(postParams)  # shallow copy is enough, the values are scalars
         shareParams['fields'] += ',from'  # we want to identify the user who shared the post
 
         # Select useful comment fields: https://developers.facebook.com/docs/graph-api/reference/v2.8/comment/
@@ -420,24 +710,30 @@ class GraphApi:
             postParams['since'] = POSTS_PUBLISHED_SINCE
 
 
-        interactionTemplate = {
-            'id': None,
-            'status_id': None,
-            'status_author': author_id,
-            'type': None,
-            'author': None,
-            'origin': 'facebook'
-        }
+        # Relative-url query strings for the batched interaction endpoints; the
+        # limit is explicit because batched sub-requests don't go through
+        # get_all_elements
+        interactionQueries = (
+            ('comment', 'comments?' + urllib.parse.urlencode({'fields': commentParams['fields'], 'limit': 100})),
+            ('like', 'likes?limit=100'),
+            ('share', 'sharedposts?' + urllib.parse.urlencode({'fields': shareParams['fields'], 'limit': 100})),
+        )
+
+        # Stream the records to disk as they arrive instead of buffering ~20 MB
+        # lists in memory and re-walking them in one big final dump
+        postWriter = JsonListWriter(data_subdir, 'post')
+        interactionWriter = JsonListWriter(data_subdir, 'interaction')
 
-        posts = []
-        interactions = []
         postCount = 0
-        commentCount = 0
-        likeCount = 0
-        shareCount = 0
+        interactionCounts = {'comment': 0, 'like': 0, 'share': 0}
+        # Queued interaction sub-requests: (post id, interaction type, relative url)
+        pendingRequests = []
+        # Batches currently on the wire: (window, future) pairs, oldest first
+        inFlight = collections.deque()
 
         try:
             print("\nStarted at {0}\n".format(datetime.datetime.now().isoformat(sep=' ')))
+            lastProgress = time.monotonic()
 
             for post in self.get_all_elements("{0}/posts".format(author_id), postParams):
                 postCount += 1
@@ -453,77 +749,57 @@ class GraphApi:
                 else:
                     post['share_count'] = 0
 
-                posts.append(post)
-                # Dump if necessary
-                if self.get_post_list_size(posts) > DATA_FILE_SIZE:
-                    self.save_data(posts, data_subdir=data_subdir, filename_prefix='post')
-                    posts = []
-
-                # Fetch comments and create an interaction for each one
-                for comment in self.get_all_elements('{0}/comments'.format(postId), commentParams):
-                    commentCount += 1
-
-                    interaction = copy.deepcopy(interactionTemplate)
-                    interaction['type'] = 'comment'
-                    interaction['id'] = comment['id']
-                    interaction['status_id'] = postId
-                    interaction['created_time'] = comment['created_time']
-                    interaction['author'] = comment['from']['id']
-                    interaction['message'] = comment['message']
-                    interaction['like_count'] = comment['like_count']
-
-                    interactions = self.append_interaction(interactions, interaction, data_subdir)
-
-                    #userIds.add(comment['from']['id'])  # comment author
-
-                # Fetch all likes and create an interaction record for all of them
-                for like in self.get_all_elements('{0}/likes'.format(postId)):
-                    likeCount += 1
-
-                    # Likes does not have an id, so we need to generate it
-                    # Returned (in the graph response) 'id' element is an id of the user who liked the post
-                    interaction = copy.deepcopy(interactionTemplate)
-                    interaction['id'] = "L_{0}_{1}".format(like['id'], postId)  # L_author_statusId
-                    interaction['type'] = 'like'
-                    interaction['status_id'] = postId
-                    interaction['author'] = like['id']
-
-                    interactions = self.append_interaction(interactions, interaction, data_subdir)
-
-                    #userIds.add(like['id'])  # like author
-
-                # Fetch all shares
-                for share in self.get_all_elements('{0}/sharedposts'.format(postId), shareParams):
-                    shareCount += 1
-
-                    interaction = copy.deepcopy(interactionTemplate)
-                    interaction['type'] = 'share'
-                    interaction['id'] = share['id']
-                    interaction['status_id'] = postId
-                    interaction['created_time'] = share['created_time']
-                    interaction['author'] = share['from']['id']
-                    interaction['message'] = share.get('message', '')
-
-                    interactions = self.append_interaction(interactions, interaction, data_subdir)
-
-                    #userIds.add(share['from']['id'])  # share author
-
-                if postCount % 10 == 0:
+                postWriter.append(post)
+
+                # Queue the comments/likes/shares sub-requests of this post;
+                # they are executed GRAPH_BATCH_LIMIT at a time in one POST
+                # instead of three paginated request chains per post
+                for interactionType, query in interactionQueries:
+                    pendingRequests.append((postId, interactionType, '{0}/{1}'.format(postId, query)))
+
+                # Put full batches on the wire as soon as we have enough
+                # sub-requests queued, several at a time
+                self._submit_interaction_batches(pendingRequests, inFlight)
+
+                # Once the pipeline is full, process the oldest finished batch;
+                # responses are handled here in the main thread, so the lists
+                # and data files are never touched by the workers
+                while len(inFlight) >= BATCH_MAX_WORKERS:
+                    window, future = inFlight.popleft()
+                    followUps = self._process_interaction_batch(
+                            window, future.result(), author_id,
+                            interactionWriter, interactionCounts)
+                    pendingRequests.extend(followUps)
+
+                # Progress is throttled by time, not iteration count, so a
+                # fast stretch of posts doesn't spam tty flushes
+                now = time.monotonic()
+                if now - lastProgress > 1.0:
                     print("Posts downloaded: {0}/{1}".format(postCount, POST_COUNT))
+                    lastProgress = now
                 if postCount >= POST_COUNT:
                     break
 
+            # Drain the remaining (partial) batches and their follow-up pages
+            self._submit_interaction_batches(pendingRequests, inFlight, allow_partial=True)
+            while inFlight:
+                window, future = inFlight.popleft()
+                followUps = self._process_interaction_batch(
+                        window, future.result(), author_id,
+                        interactionWriter, interactionCounts)
+                pendingRequests.extend(followUps)
+                self._submit_interaction_batches(pendingRequests, inFlight, allow_partial=True)
+
         finally:
-            # Save the final data
-            if interactions:
-                self.save_data(interactions, data_subdir=data_subdir, filename_prefix='interaction')
-            if posts:
-                self.save_data(posts, data_subdir=data_subdir, filename_prefix='posts')
+            # Finalize the (partially written) data files
+            interactionWriter.close()
+            postWriter.close()
 
             print("\nFinished at {0}\n".format(datetime.datetime.now().isoformat(sep=' ')))
             print("Total post count:", postCount)
             print("Total interaction count: {0} ({1} likes, {2} comments, {3} shares)".format(
-                  likeCount + commentCount + shareCount, likeCount, commentCount, shareCount))
+                  sum(interactionCounts.values()), interactionCounts['like'],
+                  interactionCounts['comment'], interactionCounts['share']))
 
 
 
@@ -562,6 +838,9 @@ def Main():
     # Save all the data (posts, likes, comments, shares)
     graph.save_full_author_data(authorId, dataSubdir)
 
+    # Don't exit before the background flushes are done
+    WaitForFsyncs()
+
     return 0
 
 
@@ -3,7 +3,7 @@
     Manually analyze the gender in the given file
 """
 
-import sys, os, unicodedata
+import sys, os, unicodedata, functools
 
 # Corpus files in the same directory
 THIS_FILE_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -29,18 +29,23 @@ def InitNameDict():
         if len(allNames) != len(allGenders):
             raise ValueError("Invalid name or gender file: sizes don't match")
 
-        for i, name in enumerate(allNames):
-            NAME_DICT[name] = allGenders[i]
+        for name, gender in zip(allNames, allGenders):
+            NAME_DICT[name] = gender
 
-        # Now add normalized versions of names (without accents)
-        for i, name in enumerate(allNames):
+        # Now add normalized versions of names (without accents); most corpus
+        # entries are already plain ASCII, so skip those
+        for name in allNames:
             normalized = NormalizeString(name)
-            if normalized not in NAME_DICT:
+            if normalized != name and normalized not in NAME_DICT:
                 NAME_DICT[normalized] = NAME_DICT[name]
 
 
+@functools.lru_cache(maxsize=65536)
 def NormalizeString(string):
-    """ Normalize given string (remove accents etc.) """
+    """ Normalize given string (remove accents etc.)
+
+    First names repeat a lot across the data, so the results are memoized.
+    """
 
     normalized = unicodedata.normalize('NFD', string)
     normalized = normalized.encode('ASCII', 'ignore')  # ignore non ascii chars
@@ -56,13 +61,15 @@ def AnalyzeGender(first_name, last_name=None):
     :return: one letter specifying the gender, 'x' for unknown
     """
 
-    if first_name in NAME_DICT:
-        return NAME_DICT[first_name]
-    # Try to look for a normalized version
-    elif NormalizeString(first_name) in NAME_DICT:
-        return NAME_DICT[NormalizeString(first_name)]
+    gender = NAME_DICT.get(first_name)
+    if gender:
+        return gender
+    # Try to look for a normalized version (computed once)
+    gender = NAME_DICT.get(NormalizeString(first_name))
+    if gender:
+        return gender
     # Try to analyze the last name
-    elif last_name:
+    if last_name:
         normalized = NormalizeString(last_name)
         if normalized.endswith('ova'):  # Czech female surnames usually ends with 'ova'
             return 'f'
@@ -3,56 +3,73 @@
     Analyze sentiment
 """
 
-import sys, os, pickle
+import sys, os, functools
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics import classification_report
-from sklearn.pipeline import Pipeline
-from sklearn import svm
+import joblib
+
+# scikit-learn is imported lazily inside TrainClassifier: it costs hundreds of
+# milliseconds to initialize, and the common consumers of this module only load
+# an already trained classifier (which pulls in just what it pickled)
 
 # Training data
 # Labels: 'p' (positive), 'n' (negative), '0' (neutral), 'b' (bipolar)
 POSTS_FILE = os.path.join('fb_corpus', 'gold-posts.txt')
 LABELS_FILE = os.path.join('fb_corpus', 'gold-labels.txt')
 
+SENTIMENT_CLASSES = ['p', 'n', '0', 'b']
+# How many corpus lines to train on in one partial_fit call
+TRAIN_BATCH_SIZE = 10000
+
 DEFAULT_CLASSIFIER_FILENAME = 'default_classifier.pkl'
 
 
 def TrainClassifier():
     """ Train a sentiment classifier
 
+    The corpus is streamed through the classifier in fixed-size batches, so
+    memory use stays flat no matter how big the training files get.
+
     :return: trained classifier
     """
 
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+
     print("Training sentiment classifier")
 
-    # Read the data
-    labels = []
+    # HashingVectorizer is stateless (no vocabulary to fit), which allows
+    # incremental training via partial_fit; SGD with hinge loss gives the
+    # same linear-SVM style decision function the previous LinearSVC did
+    vectorizer = HashingVectorizer(n_features=2**18, alternate_sign=False, ngram_range=(1, 2))
+    classifier = SGDClassifier(loss='hinge', n_jobs=-1)
+
+    elemCnt = 0
     posts = []
+    labels = []
     with open(POSTS_FILE, 'r') as pf, open(LABELS_FILE, 'r') as pl:
-        allPosts = pf.read().strip()
-        allLabels = pl.read().strip()
+        for post, label in zip(pf, pl):
+            posts.append(post.strip())
+            labels.append(label.strip())
+
+            if len(posts) >= TRAIN_BATCH_SIZE:
+                classifier.partial_fit(vectorizer.transform(posts), labels, classes=SENTIMENT_CLASSES)
+                elemCnt += len(posts)
+                posts = []
+                labels = []
+
+        # zip stops at the shorter file; if either file has lines left over,
+        # the corpus is inconsistent
+        if pf.readline() or pl.readline():
+            print("Invalid corpus, different number of elements for labels/posts")
+            return 1
+
+    if posts:  # train on the last partial batch
+        classifier.partial_fit(vectorizer.transform(posts), labels, classes=SENTIMENT_CLASSES)
+        elemCnt += len(posts)
 
-        posts += allPosts.split('\n')
-        labels += allLabels.split('\n')
-
-    if len(posts) != len(labels):
-        print("Invalid corpus, different number of elements for labels/posts")
-        return 1
-
-    elemCnt = len(posts)
     print("Number of elements:", elemCnt)
 
-    # Perform classification with SVM, linear kernel
-    classifier = svm.LinearSVC()
-
-    # Create feature vectors
-    # Vectorizer for feature extraction
-    vectorizer = TfidfVectorizer(sublinear_tf=True, use_idf=True)
-    trainVectors = vectorizer.fit_transform(posts)
-
-    classifier.fit(trainVectors, labels)
-
     #testVectors = VECTORIZER.transform(testPosts)
     #prediction = classifier.predict(testVectors)
     #print(classification_report(testLabels, prediction))
@@ -73,30 +90,39 @@ def SaveClassifier(classifier, filename=DEFAULT_CLASSIFIER_FILENAME):
 
     # Save the classifier
     print("Saving the classifier")
-    with open(filename, 'wb') as fp:
-        pickle.dump(classifier, fp)
+    # joblib stores the coefficient arrays in a form that can be memory
+    # mapped straight back on load
+    joblib.dump(classifier, filename, compress=0)
 
 
+@functools.lru_cache(maxsize=4)
 def LoadClassifier(filename=DEFAULT_CLASSIFIER_FILENAME):
     """ Load a classifier from the given file
 
-    :param filename: file the pickled classifier
+    Cached, so repeated calls (e.g. AnalyzeSentiment without an explicit
+    classifier) share one instance instead of re-reading the file; the
+    coefficient arrays are memory mapped rather than copied onto the heap.
+
+    :param filename: file with the saved classifier
     :return: classifier
     """
 
-    with open(filename, 'rb') as fp:
-        return pickle.load(fp)
+    return joblib.load(filename, mmap_mode='r')
 
 
 def AnalyzeSentiment(data, classifier=None):
-    """ Analyse sentiment of the given string
+    """ Analyse sentiment of the given texts
+
+    Submit texts in batches whenever possible: one predict call over N texts
+    runs as a single vectorized sparse matrix product, which is far cheaper
+    than N calls with one text each.
 
-    :param data: text you want to analyze
+    :param data: sequence of texts you want to analyze (a single string is accepted too)
     :param classifier: classifier to use. If not specified, it loads the default classifier
-    :return: array with sentiment prediction results
+    :return: array with sentiment prediction results, one per text
     """
 
-    if type(data) is not list and type(data) is not tuple:
+    if isinstance(data, str):
         data = [data]
 
     if not classifier:
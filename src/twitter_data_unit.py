@@ -2,11 +2,31 @@
     Data Unit class for Tweets.
 """
 
-import urllib
+import urllib.parse
+import functools
+
+
+@functools.lru_cache(maxsize=4096)
+def _ParseHost(url):
+    """ Return (scheme, domain without the leading 'www.') for the given url
+
+    Scraped URL sets repeat the same shortener domains over and over, so the
+    parses are memoized; urlsplit also skips the path-parameter handling that
+    urlparse does, which we don't need here.
+    """
+
+    parsed = urllib.parse.urlsplit(url)
+    return parsed.scheme, parsed.netloc.removeprefix("www.")
+
 
 class TwitterDataUnit():
     """ Data unit (e.g. one downloaded Tweet or URL). """
 
+    # With slots the instances carry no per-object __dict__, which roughly
+    # halves the memory per unit and speeds up attribute access; that adds up
+    # when the scraper holds millions of tweets
+    __slots__ = ('url', 'domain', 'scheme', 'id', 'user', 'favorite_count', 'retweet_count', '_dict')
+
     def __init__(self):
         self.url = None
         self.domain = None
@@ -15,19 +35,27 @@ class TwitterDataUnit():
         self.user = None
         self.favorite_count = 0
         self.retweet_count = 0
+        self._dict = None  # materialized once the unit is initialized
 
     def getDict(self):
-        """ Return the object content as a dictionary. """
-
-        return {
-            'url': self.url,
-            'domain': self.domain,
-            'scheme': self.scheme,
-            'id': self.id,
-            'user': self.user,
-            'favorite_count': self.favorite_count,
-            'retweet_count': self.retweet_count,
-        }
+        """ Return the object content as a dictionary.
+
+        The dictionary is built once when the unit is initialized and reused;
+        units are immutable after init, so serializing millions of them doesn't
+        rebuild the same dict per object.
+        """
+
+        if self._dict is None:
+            self._dict = {
+                'url': self.url,
+                'domain': self.domain,
+                'scheme': self.scheme,
+                'id': self.id,
+                'user': self.user,
+                'favorite_count': self.favorite_count,
+                'retweet_count': self.retweet_count,
+            }
+        return self._dict
 
     def getId(self):
         return self.id
@@ -46,6 +74,8 @@ class TwitterDataUnit():
         self.retweet_count = tweetDict.get('retweet_count', 0)
         self.url = url
 
-        parsedUrl = urllib.parse.urlparse(url)
-        self.domain = parsedUrl.netloc.replace("www.", "", 1)  # erase 'www.'
-        self.scheme = parsedUrl.scheme
+        self.scheme, self.domain = _ParseHost(url)
+
+        # Pre-materialize the dict now that all the fields are known
+        self._dict = None
+        self.getDict()
@@ -6,7 +6,15 @@ Author: Petr Jirout, xjirou07@stud.fit.vutbr.cz
 Twitter URL downloader prototype
 """
 
-import sys, os, urllib, copy, json, time, datetime
+import sys, os, re, gzip, urllib, json, time, datetime, functools, itertools
+import concurrent.futures
+
+# Serialize with orjson (a much faster C implementation) when it's installed;
+# the stdlib fallback below produces an equivalent prettified document
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 import twitter
 
@@ -20,43 +28,57 @@ RUNTIME_DURATION = 120
 # Where the downloaded data are stored
 DATA_DIR = os.path.join('..', 'data')
 
-# Twitter keys and secrets are obtained from the os env variables
-CONSUMER_KEY        = os.getenv("CONSUMER_KEY", None)
-CONSUMER_SECRET     = os.getenv("CONSUMER_SECRET", None)
-ACCESS_TOKEN_KEY    = os.getenv("ACCESS_TOKEN_KEY", None)
-ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET", None)
 
-# Global Twitter API object
-twitterApi = twitter.Api(consumer_key=CONSUMER_KEY,
-                         consumer_secret=CONSUMER_SECRET,
-                         access_token_key=ACCESS_TOKEN_KEY,
-                         access_token_secret=ACCESS_TOKEN_SECRET,
-                         sleep_on_rate_limit=True)
+def _CreateTwitterApis():
+    """ Create one twitter.Api client per credential set in the environment
+
+    Keys and secrets are obtained from the os env variables CONSUMER_KEY,
+    CONSUMER_SECRET, ACCESS_TOKEN_KEY and ACCESS_TOKEN_SECRET, plus any
+    numbered variants (CONSUMER_KEY_2, CONSUMER_SECRET_2, ...). The search
+    rate limit is per key, so rotating requests over K credential sets
+    raises the effective limit K times.
+    """
+
+    apis = []
+    for suffix in [''] + [ '_{0}'.format(n) for n in range(2, 10) ]:
+        consumerKey = os.getenv("CONSUMER_KEY" + suffix, None)
+        if not consumerKey and suffix:
+            continue
+        apis.append(twitter.Api(consumer_key=consumerKey,
+                                consumer_secret=os.getenv("CONSUMER_SECRET" + suffix, None),
+                                access_token_key=os.getenv("ACCESS_TOKEN_KEY" + suffix, None),
+                                access_token_secret=os.getenv("ACCESS_TOKEN_SECRET" + suffix, None),
+                                sleep_on_rate_limit=True))
+    return apis
+
+
+# Global Twitter API clients; requests rotate across them round-robin
+twitterApis = _CreateTwitterApis()
+_twitterApiCycle = itertools.cycle(twitterApis)
 
 
 
+# The raw search query, compiled once at import: neither the keyword quoting
+# nor the parameter joining changes between requests (only max_id is appended
+# per request in GetTweets)
+#TODO Specify desired keywords
+_BASE_QUERY = urllib.parse.urlencode([
+    ('q', "article OR security OR IT OR technology filter:links"),
+    ('lang', 'en'),
+    #('result_type', 'popular'),
+    ('result_type', 'recent'),
+    ('count', RESULTS_FETCH_COUNT),
+], quote_via=urllib.parse.quote)
+
+
 def CreateQuery():
-    """ Create a raw query.
+    """ Return the raw query.
 
     We ask for 100 tweets, but Twitter usually filters it, so in reality
     we get a smaller count """
 
-    #TODO Specify desired keywords
-    searchStr = "article OR security OR IT OR technology filter:links"
-    # URL encode the search string
-    searchStr = urllib.parse.quote(searchStr)
-    # Search parameters, not to be encoded
-    parameters = [
-        "lang=en",
-        #"result_type=popular",
-        "result_type=recent",
-        "count=%d" % RESULTS_FETCH_COUNT,
-    ]
-
-    query = searchStr + '&' + '&'.join(parameters)
-
-    print("Query:", query)
-    return query
+    print("Query:", _BASE_QUERY)
+    return _BASE_QUERY
 
 
 def CreateDataUnitsFromTweet(tweetStatus):
@@ -65,12 +87,23 @@ def CreateDataUnitsFromTweet(tweetStatus):
     Returns a list of extracted DataUnit objects: URL with their associated user, id, retweet and favourite count.
     """
 
-    tweet = tweetStatus.AsDict()
-    results = []
+    urls = tweetStatus.urls or []
+    if not urls:
+        return []
+
+    # Read just the attributes we need instead of letting AsDict() recursively
+    # convert the whole Status (user, media, entities, retweeted status, ...)
+    # into nested dicts for every tweet
+    tweet = {
+        'id_str': tweetStatus.id_str,
+        'user': {'screen_name': tweetStatus.user.screen_name},
+        'favorite_count': tweetStatus.favorite_count or 0,
+        'retweet_count': tweetStatus.retweet_count or 0,
+    }
 
-    urls = tweet['urls']
+    results = []
     for urlObj in urls:
-        url = TrimAndFilterUrl(urlObj['expanded_url'])
+        url = TrimAndFilterUrl(urlObj.expanded_url)
         if not url:  # url filtered, skip it
             continue
 
@@ -82,19 +115,40 @@ def CreateDataUnitsFromTweet(tweetStatus):
     return results
 
 
+@functools.lru_cache(maxsize=4096)
+def _ParseUrl(url):
+    """ Parse the given url, memoized
+
+    Many tweets share the same expanded URLs across batches, so repeated
+    parses come out of the cache; urlsplit skips the path-parameter handling
+    of urlparse, which nothing here needs.
+    """
+
+    return urllib.parse.urlsplit(url)
+
+
+# Filter rules, matched as prefixes against 'domain + path' of each url.
+# Compiled into one alternation regex, so adding a rule doesn't add another
+# string comparison per url.
+_FILTER_RULES = [
+    # Twitter backlinks to the status itself, i.e. when status with ID 123456
+    # contains url of the status: twitter.com/i/web/status/123456
+    "twitter.com/i/web/status/",
+]
+_FILTER_RE = re.compile("^(?:" + "|".join(re.escape(rule) for rule in _FILTER_RULES) + ")")
+
+
 def TrimAndFilterUrl(url):
     """ Remove unnecessary parts of the url and check if it isn't in the filter rules.
 
     Return domain + element path, e.g.: domain.com/my/resource.img
     """
 
-    res = urllib.parse.urlparse(url)
+    res = _ParseUrl(url)
 
-    domain = res.netloc.replace("www.", "", 1)  # erase 'www.'
+    domain = res.netloc.removeprefix("www.")  # erase leading 'www.'
 
-    # Filter Twitter backlinks to the status itself
-    # I.e. when status with ID 123456 containts url of the status: twitter.com/i/web/status/123456
-    if domain == "twitter.com" and res.path.startswith("/i/web/status/"):
+    if _FILTER_RE.match(domain + res.path):
         return None
 
     scheme = ""
@@ -110,45 +164,44 @@ def TrimAndFilterUrl(url):
 def ExtractDomainFromUrl(url):
     """ Extract just the domain name. """
 
-    res = urllib.parse.urlparse(url)
-    domain = res.netloc.replace("www.", "", 1)  # erase 'www.'
+    res = _ParseUrl(url)
 
-    return domain
+    return res.netloc.removeprefix("www.")  # erase leading 'www.'
 
 
-def SaveResults(results):
-    """ Save results to the DATA_DIR, in format 'data_NUM.json' """
+if orjson is not None:
+    def _DumpUnitLine(unit):
+        return orjson.dumps(unit.getDict()).decode('utf-8') + '\n'
+else:
+    def _DumpUnitLine(unit):
+        return json.dumps(unit.getDict(), ensure_ascii=False) + '\n'
 
-    # Because we're using a custom class to store the data (DataUnit), we
-    # need to provide a default data dumper for objects, which cannot be serialized
-    # automatically (i.e. our DataUnits)
-    def _objDumper(obj):
-        try:
-            return obj.getDict()
-        except:
-            return obj.__dict__
+
+def OpenResultsFile():
+    """ Open a new results file in the DATA_DIR, in format 'data_NUM.jsonl.gz'
+
+    The results are streamed into it one JSON line per data unit, so nothing
+    has to be buffered until shutdown and a killed run keeps everything
+    written so far. JSON lines compress very well (repeated keys and domains),
+    and compresslevel=1 keeps the CPU cost per line negligible.
+    """
 
     # Create the directory if necessary
     if not os.path.isdir(DATA_DIR):
         if os.path.exists(DATA_DIR):  # it's a regular file, abort
-            print("Data directory '%s' cannot be created, there's a file with the same name" % DATA_DIR)
-            return False
-        else:
-            os.makedirs(DATA_DIR)
+            raise ValueError("Data directory '%s' cannot be created, there's a file with the same name" % DATA_DIR)
+        os.makedirs(DATA_DIR)
 
     counter = 0
     while True:
-        filename = "data_%d.json" % counter
+        filename = "data_%d.jsonl.gz" % counter
         filename = os.path.join(DATA_DIR, filename)
         if not os.path.exists(filename):
             break
         counter += 1
 
-    with open(filename, 'w') as fp:
-        json.dump(results, fp, default=_objDumper, indent=2)
-
-    print("Saved results to", filename)
-    return True
+    print("Saving results to", filename)
+    return gzip.open(filename, 'wt', compresslevel=1, encoding='utf-8')
 
 
 def GetTweets(query, max_id=None):
@@ -156,14 +209,15 @@ def GetTweets(query, max_id=None):
 
     Params:
         query:  search query
-        max_id: return tweets older than given ID (i.e. smaller ID) (optional)
+        max_id: return tweets older than given ID (i.e. smaller ID) (int, optional)
     """
 
     if max_id:
-        query += "&max_id=%s" % str(max_id)
+        query += "&max_id=%d" % max_id
 
     print("Making query:", query)
-    tweets = twitterApi.GetSearch(raw_query="q="+query)
+    # Next client in the rotation; each one has its own rate-limit window
+    tweets = next(_twitterApiCycle).GetSearch(raw_query=query)
     return tweets
 
 
@@ -173,46 +227,59 @@ def Main():
 
     query = CreateQuery()
 
-    startTime = datetime.datetime.now()
-    print("Started at:", startTime)
-    # How long should the script run
-    runDuration = datetime.timedelta(minutes=RUNTIME_DURATION)
+    print("Started at:", datetime.datetime.now())
+    # When to stop; monotonic time is immune to wall clock adjustments
+    deadline = time.monotonic() + RUNTIME_DURATION * 60
 
-    results = []
-    resultsIds = []
+    resultsCount = 0
+    resultsIds = set()  # seen tweet IDs; O(1) membership instead of a list scan per tweet
+    resultsFp = OpenResultsFile()
+
+    # One background worker keeps the next search request on the wire while
+    # this thread dedups the previous page and sits in the rate-limit sleep.
+    # More concurrency wouldn't help a single API key: each request's max_id
+    # comes from the page before it, so the pagination chain is sequential.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     try:
         maxId = None
+        pendingTweets = executor.submit(GetTweets, query, maxId)
         for i in range(360000): # maximum of 360 000 iterations (requests)
-            tweets = GetTweets(query, maxId)
+            tweets = pendingTweets.result()
 
             for tweet in tweets:
                 dus = CreateDataUnitsFromTweet(tweet)
                 if dus:
                     # First iteration, initialize maxId
                     if maxId is None:
-                        maxId = dus[0].getId()
+                        maxId = int(dus[0].getId())
                     # Append only if we already don't have these elements
                     for du in dus:
-                        duId = du.getId()
+                        duId = int(du.getId())  # IDs are kept as ints, cheap to hash and compare
                         # We want the smallest ID as the max_id parameter
-                        maxId = str( min(int(maxId), int(duId)) )
+                        if duId < maxId:
+                            maxId = duId
 
                         if duId in resultsIds:  # we already have this tweet, skip it
                             continue
 
-                        results.append(du)
-                        resultsIds.append(duId)
+                        resultsFp.write(_DumpUnitLine(du))
+                        resultsCount += 1
+                        resultsIds.add(duId)
+
+            # Kick off the next request right away; the sleep below then
+            # overlaps with the network wait instead of adding to it
+            pendingTweets = executor.submit(GetTweets, query, maxId)
 
-            print("Total tweets:", len(results))
+            print("Total tweets:", resultsCount)
 
             time.sleep(1)
             print(i, end=' ', flush=True)
-            nowTime = datetime.datetime.now()
-            if startTime + runDuration < nowTime:  # time limit expired, terminate
+            if time.monotonic() > deadline:  # time limit expired, terminate
                 break
 
     finally:
-        SaveResults(results)
+        executor.shutdown(wait=False)
+        resultsFp.close()
 
     return 0
 